@@ -9,6 +9,9 @@ import sys
 
 API_BASE_URL = "http://localhost:8000"
 
+# One session for the whole demo so requests reuse keep-alive connections
+session = requests.Session()
+
 def print_header(title):
     """Print a formatted header."""
     print(f"\n{'='*60}")
@@ -41,7 +44,7 @@ def demo_comprehensive_analysis():
     print("🚀 Running comprehensive analysis with sample data...")
     
     try:
-        response = requests.post(f"{API_BASE_URL}/demo/quick-analysis")
+        response = session.post(f"{API_BASE_URL}/demo/quick-analysis")
         response.raise_for_status()
         data = response.json()
         
@@ -138,9 +141,10 @@ def demo_individual_endpoints():
         "Rivals Data": "/sample/rivals"
     }
     
+    # Fetched one at a time: the shared session is not safe to use from several threads
     for name, endpoint in endpoints.items():
         try:
-            response = requests.get(f"{API_BASE_URL}{endpoint}")
+            response = session.get(f"{API_BASE_URL}{endpoint}")
             response.raise_for_status()
             data = response.json()
             
@@ -162,7 +166,7 @@ def main():
     
     # Test basic connectivity
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
+        response = session.get(f"{API_BASE_URL}/health", timeout=5)
         response.raise_for_status()
         print("✅ API server is running")
     except Exception as e:
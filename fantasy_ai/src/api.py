@@ -2,9 +2,14 @@
 FastAPI endpoints for Fantasy LaLiga decision assistant.
 """
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache, wraps
+from enum import Enum
+import asyncio
 import uvicorn
 from contextlib import asynccontextmanager
 
@@ -14,12 +19,13 @@ from .schemas import (
     BidRecommendation, DifferentialAnalysis, RecommendationResponse
 )
 from .recommend import (
-    analyze_myteam, analyze_market, recommend_swaps,
+    analyze_player, analyze_myteam, analyze_market, recommend_swaps,
     recommend_bids, find_differentials, generate_comprehensive_recommendations
 )
 from .loaders import (
     load_players_from_json, load_team_state_from_json,
-    load_market_from_json, load_rivals_from_json, create_sample_data_files
+    load_market_from_json, load_rivals_from_json, create_sample_data_files,
+    get_data_file_path
 )
 
 
@@ -32,12 +38,190 @@ app_data = {
 }
 
 
+@lru_cache(maxsize=1)
+def _load_sample_players() -> List[Player]:
+    """Load the sample players once per process (callers must not mutate them)."""
+    return load_players_from_json(get_data_file_path('sample_players.json'))
+
+
+@lru_cache(maxsize=1)
+def _load_sample_players_by_id() -> Dict[int, Player]:
+    """Index the sample players by id once per process."""
+    return {player.id: player for player in _load_sample_players()}
+
+
+@lru_cache(maxsize=1024)
+def _analyze_sample_player(player_id: int) -> PlayerAnalysis:
+    """
+    Analyze a sample player once per process (callers must not mutate the result).
+    
+    Raises:
+        KeyError: If no sample player has this id
+    """
+    return analyze_player(_load_sample_players_by_id()[player_id])
+
+
+@lru_cache(maxsize=1)
+def _load_sample_team() -> TeamState:
+    """Load the sample team once per process (callers must not mutate it)."""
+    return load_team_state_from_json(get_data_file_path('sample_team.json'))
+
+
+@lru_cache(maxsize=1)
+def _load_sample_market() -> Market:
+    """Load the sample market once per process (callers must not mutate it)."""
+    return load_market_from_json(get_data_file_path('sample_market.json'))
+
+
+@lru_cache(maxsize=1)
+def _load_sample_rivals() -> List[RivalTeam]:
+    """Load the sample league rivals once per process (callers must not mutate them)."""
+    return load_rivals_from_json(get_data_file_path('sample_rivals.json'))
+
+
+@lru_cache(maxsize=1)
+def _quick_demo_recommendations() -> RecommendationResponse:
+    """
+    Analyze the sample team, market and rivals once per process.
+    
+    The sample data is loaded once and analysis is deterministic in it, so the demo
+    endpoint reuses the result instead of re-vectorizing the same players on every
+    call (callers must not mutate it).
+    """
+    return generate_comprehensive_recommendations(
+        _load_sample_team(), _load_sample_market(), _load_sample_rivals()
+    )
+
+
+# Loader and serializer for each sample dataset served by the /sample endpoints
+_SAMPLE_DATA = {
+    "players": (_load_sample_players, TypeAdapter(List[Player])),
+    "team": (_load_sample_team, TypeAdapter(TeamState)),
+    "market": (_load_sample_market, TypeAdapter(Market)),
+    "rivals": (_load_sample_rivals, TypeAdapter(List[RivalTeam])),
+}
+
+
+@lru_cache(maxsize=len(_SAMPLE_DATA))
+def _sample_json(name: str) -> bytes:
+    """
+    Serialize a sample dataset to JSON once per process.
+    
+    The sample data never changes between requests, so the /sample endpoints
+    return these bytes directly instead of re-serializing the models each time.
+    """
+    loader, adapter = _SAMPLE_DATA[name]
+    return adapter.dump_json(loader())
+
+
+@lru_cache(maxsize=32)
+def _analyze_market_cached(market_json: str) -> MarketAnalysis:
+    """
+    Memoize market analysis on the canonical JSON of the market.
+    
+    Analysis is deterministic in the market state, so repeated requests for the
+    same market reuse the result (callers must not mutate it).
+    """
+    return analyze_market(Market.model_validate_json(market_json))
+
+
+_rivals_adapter = TypeAdapter(List[RivalTeam])
+
+
+@lru_cache(maxsize=32)
+def _find_differentials_cached(team_json: str, market_json: str, rivals_json: bytes,
+                               min_ownership_threshold: float) -> Tuple[DifferentialAnalysis, ...]:
+    """
+    Memoize differential analysis on the canonical JSON of its inputs.
+    
+    Returns an immutable tuple so cached results cannot be altered by callers.
+    """
+    differentials = find_differentials(
+        TeamState.model_validate_json(team_json),
+        Market.model_validate_json(market_json),
+        _rivals_adapter.validate_json(rivals_json),
+        min_ownership_threshold
+    )
+    return tuple(differentials)
+
+
+# Market analyses currently running, keyed by market JSON
+_inflight_market_analyses: Dict[str, asyncio.Future] = {}
+
+
+async def _analyze_market_shared(market: Market) -> MarketAnalysis:
+    """
+    Run market analysis in the threadpool, sharing it between concurrent requests.
+    
+    Identical markets submitted while an analysis is still running await the same
+    result instead of queueing duplicate work on the threadpool.
+    """
+    market_json = market.model_dump_json()
+    future = _inflight_market_analyses.get(market_json)
+    if future is None:
+        future = asyncio.ensure_future(run_in_threadpool(_analyze_market_cached, market_json))
+        _inflight_market_analyses[market_json] = future
+        future.add_done_callback(lambda _: _inflight_market_analyses.pop(market_json, None))
+    
+    # Shield so one disconnected client does not cancel the analysis for the others
+    return await asyncio.shield(future)
+
+
+class EndpointError(str, Enum):
+    """Error detail prefixes reported by the endpoints."""
+    TEAM_ANALYSIS = "Error analyzing team"
+    MARKET_ANALYSIS = "Error analyzing market"
+    SWAP_RECOMMENDATIONS = "Error generating swap recommendations"
+    BID_RECOMMENDATIONS = "Error generating bid recommendations"
+    DIFFERENTIALS = "Error finding differentials"
+    COMPREHENSIVE = "Error generating comprehensive recommendations"
+    SAMPLE_PLAYERS = "Sample players not found"
+    SAMPLE_TEAM = "Sample team not found"
+    SAMPLE_MARKET = "Sample market not found"
+    SAMPLE_RIVALS = "Sample rivals not found"
+    DEMO_ANALYSIS = "Error running demo analysis"
+    PLAYER_ANALYSIS = "Error analyzing player"
+
+
+def _reports_errors(error: EndpointError, status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
+    """
+    Report unexpected endpoint failures as an HTTPException.
+    
+    Keeps error handling out of the endpoint bodies: HTTPExceptions raised by the
+    endpoint pass through unchanged, anything else becomes status_code with the
+    error prefix and exception message as detail.
+    
+    Args:
+        error: Detail prefix for the endpoint
+        status_code: Status code for unexpected errors
+    """
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=status_code, detail=f"{error.value}: {e}") from e
+        return wrapper
+    return decorator
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager to load initial data."""
     try:
         # Create sample data on startup
         create_sample_data_files()
+        _load_sample_players.cache_clear()
+        _load_sample_players_by_id.cache_clear()
+        _analyze_sample_player.cache_clear()
+        _load_sample_team.cache_clear()
+        _load_sample_market.cache_clear()
+        _load_sample_rivals.cache_clear()
+        _sample_json.cache_clear()
+        _quick_demo_recommendations.cache_clear()
         print("✅ Sample data files created")
     except Exception as e:
         print(f"❌ Error creating sample data: {e}")
@@ -58,13 +242,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add CORS middleware
+# Add CORS middleware for the local web UIs; preflight responses are cached for a day
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify allowed origins
+    allow_origins=["http://localhost:8501", "http://localhost:3000"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 
@@ -93,6 +278,7 @@ async def health_check():
 
 
 @app.post("/analysis/myteam", response_model=TeamAnalysis, tags=["Analysis"])
+@_reports_errors(EndpointError.TEAM_ANALYSIS)
 async def analyze_my_team(team_state: TeamState):
     """
     Analyze user's team and identify players to sell vs keep.
@@ -103,17 +289,11 @@ async def analyze_my_team(team_state: TeamState):
     Returns:
         TeamAnalysis with players to sell/keep and team balance assessment
     """
-    try:
-        analysis = analyze_myteam(team_state)
-        return analysis
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error analyzing team: {str(e)}"
-        )
+    return await run_in_threadpool(analyze_myteam, team_state)
 
 
 @app.post("/analysis/market", response_model=MarketAnalysis, tags=["Analysis"])
+@_reports_errors(EndpointError.MARKET_ANALYSIS)
 async def analyze_market_endpoint(market: Market):
     """
     Analyze market to find best buys, overpriced players, and bargains.
@@ -124,39 +304,29 @@ async def analyze_market_endpoint(market: Market):
     Returns:
         MarketAnalysis with categorized player recommendations
     """
-    try:
-        analysis = analyze_market(market)
-        return analysis
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error analyzing market: {str(e)}"
-        )
+    return await _analyze_market_shared(market)
 
 
 @app.post("/recommend/swaps", response_model=List[SwapRecommendation], tags=["Recommendations"])
-async def recommend_player_swaps(team_state: TeamState, market: Market):
+@_reports_errors(EndpointError.SWAP_RECOMMENDATIONS)
+async def recommend_player_swaps(team_state: TeamState, market: Market, one_to_one: bool = False):
     """
     Recommend player swaps (sell + buy combinations).
     
     Args:
         team_state: Current team state
         market: Market state with available players
+        one_to_one: Only return swaps that can all be made together (no player
+            sold or bought twice, combined cost within the bankroll)
     
     Returns:
         List of swap recommendations with expected points gain
     """
-    try:
-        swaps = recommend_swaps(team_state, market)
-        return swaps
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating swap recommendations: {str(e)}"
-        )
+    return await run_in_threadpool(recommend_swaps, team_state, market, one_to_one=one_to_one)
 
 
 @app.post("/recommend/bids", response_model=List[BidRecommendation], tags=["Recommendations"])
+@_reports_errors(EndpointError.BID_RECOMMENDATIONS)
 async def recommend_bidding_strategy(
     team_state: TeamState, 
     market: Market,
@@ -173,17 +343,11 @@ async def recommend_bidding_strategy(
     Returns:
         List of bid recommendations with min/max ranges and risk assessment
     """
-    try:
-        bids = recommend_bids(team_state, market, target_players)
-        return bids
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating bid recommendations: {str(e)}"
-        )
+    return await run_in_threadpool(recommend_bids, team_state, market, target_players)
 
 
 @app.post("/league/differentials", response_model=List[DifferentialAnalysis], tags=["League"])
+@_reports_errors(EndpointError.DIFFERENTIALS)
 async def find_differential_players(
     team_state: TeamState,
     market: Market, 
@@ -202,17 +366,18 @@ async def find_differential_players(
     Returns:
         List of differential player analyses
     """
-    try:
-        differentials = find_differentials(team_state, market, rivals, min_ownership_threshold)
-        return differentials
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error finding differentials: {str(e)}"
-        )
+    differentials = await run_in_threadpool(
+        _find_differentials_cached,
+        team_state.model_dump_json(),
+        market.model_dump_json(),
+        _rivals_adapter.dump_json(rivals),
+        min_ownership_threshold
+    )
+    return list(differentials)
 
 
 @app.post("/recommend/comprehensive", response_model=RecommendationResponse, tags=["Recommendations"])
+@_reports_errors(EndpointError.COMPREHENSIVE)
 async def comprehensive_recommendations(
     team_state: TeamState,
     market: Market,
@@ -229,136 +394,64 @@ async def comprehensive_recommendations(
     Returns:
         Complete recommendation response with all analyses
     """
-    try:
-        recommendations = generate_comprehensive_recommendations(team_state, market, rivals)
-        return recommendations
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating comprehensive recommendations: {str(e)}"
-        )
+    return await run_in_threadpool(
+        generate_comprehensive_recommendations, team_state, market, rivals
+    )
 
 
 # Sample data endpoints for testing
 @app.get("/sample/players", response_model=List[Player], tags=["Sample Data"])
+@_reports_errors(EndpointError.SAMPLE_PLAYERS, status.HTTP_404_NOT_FOUND)
 async def get_sample_players():
     """Get sample player data for testing."""
-    try:
-        from .loaders import get_data_file_path, load_players_from_json
-        file_path = get_data_file_path('sample_players.json')
-        players = load_players_from_json(file_path)
-        return players
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Sample players not found: {str(e)}"
-        )
+    return Response(content=_sample_json("players"), media_type="application/json")
 
 
 @app.get("/sample/team", response_model=TeamState, tags=["Sample Data"])
+@_reports_errors(EndpointError.SAMPLE_TEAM, status.HTTP_404_NOT_FOUND)
 async def get_sample_team():
     """Get sample team data for testing."""
-    try:
-        from .loaders import get_data_file_path, load_team_state_from_json
-        file_path = get_data_file_path('sample_team.json')
-        team = load_team_state_from_json(file_path)
-        return team
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Sample team not found: {str(e)}"
-        )
+    return Response(content=_sample_json("team"), media_type="application/json")
 
 
 @app.get("/sample/market", response_model=Market, tags=["Sample Data"])
+@_reports_errors(EndpointError.SAMPLE_MARKET, status.HTTP_404_NOT_FOUND)
 async def get_sample_market():
     """Get sample market data for testing."""
-    try:
-        from .loaders import get_data_file_path, load_market_from_json
-        file_path = get_data_file_path('sample_market.json')
-        market = load_market_from_json(file_path)
-        return market
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Sample market not found: {str(e)}"
-        )
+    return Response(content=_sample_json("market"), media_type="application/json")
 
 
 @app.get("/sample/rivals", response_model=List[RivalTeam], tags=["Sample Data"])
+@_reports_errors(EndpointError.SAMPLE_RIVALS, status.HTTP_404_NOT_FOUND)
 async def get_sample_rivals():
     """Get sample rival team data for testing."""
-    try:
-        from .loaders import get_data_file_path, load_rivals_from_json
-        file_path = get_data_file_path('sample_rivals.json')
-        rivals = load_rivals_from_json(file_path)
-        return rivals
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Sample rivals not found: {str(e)}"
-        )
+    return Response(content=_sample_json("rivals"), media_type="application/json")
 
 
 @app.post("/demo/quick-analysis", response_model=RecommendationResponse, tags=["Demo"])
+@_reports_errors(EndpointError.DEMO_ANALYSIS)
 async def quick_demo_analysis():
     """
     Quick demo using sample data to showcase the system.
     """
-    try:
-        from .loaders import get_data_file_path, load_team_state_from_json, load_market_from_json, load_rivals_from_json
-        
-        # Load sample data
-        team_path = get_data_file_path('sample_team.json')
-        market_path = get_data_file_path('sample_market.json')
-        rivals_path = get_data_file_path('sample_rivals.json')
-        
-        team_state = load_team_state_from_json(team_path)
-        market = load_market_from_json(market_path)
-        rivals = load_rivals_from_json(rivals_path)
-        
-        # Generate comprehensive recommendations
-        recommendations = generate_comprehensive_recommendations(team_state, market, rivals)
-        return recommendations
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error running demo analysis: {str(e)}"
-        )
+    # Generate comprehensive recommendations for the sample data (cached)
+    return await run_in_threadpool(_quick_demo_recommendations)
 
 
 # Utility endpoints
 @app.get("/players/{player_id}", response_model=PlayerAnalysis, tags=["Players"])
+@_reports_errors(EndpointError.PLAYER_ANALYSIS)
 async def get_player_analysis(player_id: int):
     """
     Get detailed analysis for a specific player.
     """
-    try:
-        from .loaders import get_data_file_path, load_players_from_json
-        from .recommend import analyze_player
-        
-        # Load players and find the specific one
-        file_path = get_data_file_path('sample_players.json')
-        players = load_players_from_json(file_path)
-        
-        player = next((p for p in players if p.id == player_id), None)
-        if not player:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Player with ID {player_id} not found"
-            )
-        
-        analysis = analyze_player(player)
-        return analysis
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    if player_id not in _load_sample_players_by_id():
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error analyzing player: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player with ID {player_id} not found"
         )
+    
+    return _analyze_sample_player(player_id)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,11 @@ Feature engineering functions for player analysis.
 Calculates form, fixture difficulty, availability, and risk metrics.
 """
 
+import math
 import numpy as np
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter, mul
 from typing import List, Dict, Tuple
 from .schemas import Player, PlayerStatus, Position
 
@@ -33,6 +37,199 @@ FDR_TABLE = {
     "Alaves": 2
 }
 
+# Availability multiplier by player status
+STATUS_AVAILABILITY = {
+    PlayerStatus.INJURED: 0.0,
+    PlayerStatus.SUSPENDED: 0.0,
+    PlayerStatus.DOUBTFUL: 0.3,
+    PlayerStatus.AVAILABLE: 1.0
+}
+
+# Availability multipliers indexed by status ordinal (Player.status_index)
+_STATUS_AVAILABILITY_ARRAY = np.array([STATUS_AVAILABILITY[s] for s in PlayerStatus])
+
+# Risk component weights: availability, playing time, price volatility, form consistency
+RISK_WEIGHTS = np.array([0.35, 0.35, 0.20, 0.10])
+
+# Position scarcity multipliers for valuation (1.0 = neutral)
+POSITION_SCARCITY_MULTIPLIERS = {
+    Position.PORTERO: 0.9,  # Goalkeepers generally cheaper
+    Position.DEFENSA: 1.0,  # Neutral
+    Position.CENTROCAMPISTA: 1.1,  # Slightly premium
+    Position.DELANTERO: 1.2  # Premium for goal scorers
+}
+
+
+def clip01(x):
+    """
+    Clamp a score to [0, 1].
+    
+    Arrays are clipped in place with a single np.clip. Plain numbers use bare
+    comparisons, which skip the call overhead of the builtin min/max and give
+    the same result as max(0.0, min(1.0, x)).
+    
+    Args:
+        x: Number or float array
+    
+    Returns:
+        Clamped number, or the same array clamped in place
+    """
+    if isinstance(x, np.ndarray):
+        return np.clip(x, 0.0, 1.0, out=x)
+    return (x if x > 0.0 else 0.0) if x < 1.0 else 1.0
+
+
+def mean_variance(values: List[float]) -> Tuple[float, float]:
+    """
+    Mean and population variance of a short sequence in two plain passes.
+    
+    For the handful of values tracked per player this is much faster than NumPy,
+    whose per-call overhead dwarfs the arithmetic.
+    
+    Args:
+        values: Non-empty sequence of numbers
+    
+    Returns:
+        Tuple of (mean, variance)
+    """
+    n = len(values)
+    mean = sum(values) / n
+    variance = sum((v - mean) ** 2 for v in values) / n
+    return mean, variance
+
+
+@lru_cache(maxsize=None)
+def ema_weights(n: int, alpha: float = 0.3) -> Tuple[float, ...]:
+    """
+    Closed-form EMA weights for a sequence of n >= 1 points.
+    
+    Seeding the EMA with the first point and folding in the rest gives the first
+    point weight (1 - alpha)^(n-1) and point i weight alpha * (1 - alpha)^(n-1-i),
+    so the EMA is a dot product with these weights.
+    
+    Args:
+        n: Number of points
+        alpha: EMA smoothing factor
+    
+    Returns:
+        Tuple of n weights, aligned with the points
+    """
+    decay = 1 - alpha
+    return (decay ** (n - 1),) + tuple(alpha * decay ** (n - 1 - i) for i in range(1, n))
+
+
+@lru_cache(maxsize=32)
+def ema_weight_matrix(max_len: int, alpha: float = 0.3) -> np.ndarray:
+    """
+    EMA weights for every sequence length up to max_len, for batch use.
+    
+    Args:
+        max_len: Longest sequence length
+        alpha: EMA smoothing factor
+    
+    Returns:
+        Read-only (max_len + 1, max_len) array whose row n holds ema_weights(n)
+        right-padded with zeros (row 0 is all zeros)
+    """
+    matrix = np.zeros((max_len + 1, max_len))
+    for n in range(1, max_len + 1):
+        matrix[n, :n] = ema_weights(n, alpha)
+    matrix.setflags(write=False)
+    return matrix
+
+
+@lru_cache(maxsize=4096)
+def _fixture_difficulty_total(fixtures: Tuple[str, ...]) -> int:
+    """
+    Sum of FDR_TABLE ratings over a fixture run (3 for unknown teams).
+    
+    Players from the same club share fixture runs, so each distinct run is
+    rated once instead of once per player (FDR_TABLE is treated as constant).
+    """
+    return sum(FDR_TABLE.get(team, 3) for team in fixtures)
+
+
+# Scalar Player fields gathered by pack_players, in column order
+_PACK_FIELD_NAMES = ("price", "total_points", "games_played", "minutes_played", "position_index", "status_index")
+_PACK_FIELDS = attrgetter(*_PACK_FIELD_NAMES)
+
+
+def _pad_sequences(sequences: List[Tuple], dtype=float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Right-pad variable-length sequences with zeros into a 2D matrix.
+    
+    All values are read in one flat pass and scattered through a length mask,
+    instead of converting each sequence to an array row by row.
+    
+    Args:
+        sequences: List of number sequences
+        dtype: Matrix dtype
+    
+    Returns:
+        Tuple of (matrix, lengths)
+    """
+    n = len(sequences)
+    lengths = np.fromiter(map(len, sequences), dtype=np.intp, count=n)
+    max_len = int(lengths.max()) if n else 0
+    matrix = np.zeros((n, max_len), dtype=dtype)
+    matrix[np.arange(max_len) < lengths[:, None]] = np.fromiter(
+        chain.from_iterable(sequences), dtype=dtype, count=int(lengths.sum())
+    )
+    return matrix, lengths
+
+
+def pack_players(players: List[Player], k: int = 3) -> Dict[str, np.ndarray]:
+    """
+    Gather the per-player inputs of the scoring pipeline into NumPy arrays.
+    
+    Variable-length sequences are right-padded with zeros into 2D matrices, with
+    their lengths stored alongside ('recent_len', 'price_history_len'). The sum
+    and population variance of recent points ('recent_sum', 'recent_var') are
+    computed here once for every consumer.
+    
+    Args:
+        players: List of Player objects
+        k: Number of upcoming fixtures to summarize
+    
+    Returns:
+        Dictionary of per-player arrays, in player order
+    """
+    n = len(players)
+    recent, recent_len = _pad_sequences([p.recent_points for p in players], np.int32)
+    price_history, price_history_len = _pad_sequences([p.price_history for p in players])
+    
+    # Scalar fields are read in C by one attrgetter per player, then split into
+    # contiguous columns
+    table = np.array(list(map(_PACK_FIELDS, players)), dtype=float).reshape(n, len(_PACK_FIELD_NAMES))
+    price, total_points, games_played, minutes_played, position, status = np.ascontiguousarray(table.T)
+    fixtures = [p.next_fixtures[:k] for p in players]
+    
+    packed = {
+        "recent": recent,
+        "recent_len": recent_len,
+        "price_history": price_history,
+        "price_history_len": price_history_len,
+        "price": price,
+        "total_points": total_points,
+        "games_played": games_played,
+        "minutes_played": minutes_played,
+        "position": position.astype(np.intp),
+        "status": status.astype(np.intp),
+        "fixture_sum": np.fromiter(map(_fixture_difficulty_total, map(tuple, fixtures)), dtype=float, count=n),
+        "fixture_count": np.fromiter(map(len, fixtures), dtype=float, count=n),
+    }
+    
+    packed["status_score"] = np.take(_STATUS_AVAILABILITY_ARRAY, packed["status"])
+    
+    # Recent points are integers, so sum and sum of squares give the variance
+    # exactly in a single fused read of the matrix (no mean-centred temporaries)
+    recent_sum = recent.sum(axis=1, dtype=np.int64)
+    recent_sum_sq = np.einsum("ij,ij->i", recent, recent, dtype=np.int64)
+    safe_len = np.maximum(recent_len, 1)
+    packed["recent_sum"] = recent_sum
+    packed["recent_var"] = (safe_len * recent_sum_sq - recent_sum ** 2) / (safe_len * safe_len)
+    return packed
+
 
 def calculate_form_score(recent_points: List[int], alpha: float = 0.3) -> float:
     """
@@ -52,14 +249,31 @@ def calculate_form_score(recent_points: List[int], alpha: float = 0.3) -> float:
         return min(recent_points[0], 10.0)
     
     # Calculate EMA with most recent points weighted more heavily
-    ema = recent_points[0]
-    for points in recent_points[1:]:
-        ema = alpha * points + (1 - alpha) * ema
+    weights = ema_weights(len(recent_points), alpha)
+    ema = sum(map(mul, weights, recent_points))
     
     # Scale to 0-10 (assuming max realistic points per game is 15)
     return min(ema * (10.0 / 15.0), 10.0)
 
 
+def calculate_form_scores(recent: np.ndarray, recent_len: np.ndarray, alpha: float = 0.3) -> np.ndarray:
+    """
+    Vectorized calculate_form_score over padded recent points.
+    
+    Args:
+        recent: (N, R) recent points, most recent first, right-padded with zeros
+        recent_len: Number of valid points per row
+        alpha: EMA smoothing factor
+    
+    Returns:
+        Array of form scores (0-10 scale)
+    """
+    ema = np.einsum("ij,ij->i", ema_weight_matrix(recent.shape[1], alpha)[recent_len], recent)
+    form_score = np.where(recent_len == 1, np.minimum(ema, 10.0), np.minimum(ema * (10.0 / 15.0), 10.0))
+    form_score[recent_len == 0] = 0.0
+    return form_score
+
+
 def calculate_fixture_difficulty(next_fixtures: List[str], fdr_table: Dict[str, int] = None) -> float:
     """
     Calculate average fixture difficulty for next fixtures.
@@ -75,7 +289,7 @@ def calculate_fixture_difficulty(next_fixtures: List[str], fdr_table: Dict[str,
         return 3.0  # Default neutral difficulty
     
     if fdr_table is None:
-        fdr_table = FDR_TABLE
+        return _fixture_difficulty_total(tuple(next_fixtures)) / len(next_fixtures)
     
     difficulties = []
     for team in next_fixtures:
@@ -98,26 +312,46 @@ def calculate_availability_score(player: Player) -> float:
     base_score = 1.0
     
     # Status penalties
-    status_penalties = {
-        PlayerStatus.INJURED: 0.0,
-        PlayerStatus.SUSPENDED: 0.0,
-        PlayerStatus.DOUBTFUL: 0.3,
-        PlayerStatus.AVAILABLE: 1.0
-    }
-    
-    status_score = status_penalties.get(player.availability, 1.0)
+    status_score = STATUS_AVAILABILITY.get(player.availability, 1.0)
     
     # Playing time factor (if player hasn't played much, lower availability)
     if player.games_played > 0:
         minutes_per_game = player.minutes_played / player.games_played
-        playing_time_score = min(minutes_per_game / 90.0, 1.0)  # Normalize to 90 min games
+        playing_time_score = minutes_per_game / 90.0  # Normalize to 90 min games
+        if playing_time_score > 1.0:
+            playing_time_score = 1.0
     else:
         playing_time_score = 0.5  # Unknown, assume moderate availability
     
     # Combine factors
     availability = status_score * (0.7 + 0.3 * playing_time_score)
     
-    return max(0.0, min(1.0, availability))
+    return clip01(availability)
+
+
+def _playing_time(packed: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Minutes per game (0 for players without games) and a has-played mask."""
+    games_played = packed["games_played"]
+    played = games_played > 0
+    minutes_per_game = np.divide(
+        packed["minutes_played"], games_played, out=np.zeros(len(games_played)), where=played
+    )
+    return minutes_per_game, played
+
+
+def calculate_availability_scores(packed: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Vectorized calculate_availability_score over packed players.
+    
+    Args:
+        packed: Arrays from pack_players
+    
+    Returns:
+        Array of availability scores (0-1)
+    """
+    minutes_per_game, played = _playing_time(packed)
+    playing_time_score = np.where(played, np.minimum(minutes_per_game / 90.0, 1.0), 0.5)
+    return clip01(packed["status_score"] * (0.7 + 0.3 * playing_time_score))
 
 
 def calculate_price_volatility(price_history: List[float]) -> float:
@@ -133,18 +367,16 @@ def calculate_price_volatility(price_history: List[float]) -> float:
     if len(price_history) < 2:
         return 0.0
     
-    # Calculate percentage changes
-    changes = []
-    for i in range(len(price_history) - 1):
-        if price_history[i + 1] > 0:  # Avoid division by zero
-            change = abs(price_history[i] - price_history[i + 1]) / price_history[i + 1]
-            changes.append(change)
+    # Calculate percentage changes, skipping non-positive previous prices
+    changes = [abs(current - previous) / previous
+               for current, previous in zip(price_history, price_history[1:])
+               if previous > 0]
     
     if not changes:
         return 0.0
     
     # Return standard deviation of changes, capped at 1.0
-    volatility = np.std(changes)
+    volatility = math.sqrt(mean_variance(changes)[1])
     return min(volatility * 10, 1.0)  # Scale up and cap
 
 
@@ -181,7 +413,8 @@ def calculate_risk_score(player: Player) -> float:
     # Form consistency risk (high variance in recent points = risky)
     form_risk = 0.0
     if len(player.recent_points) > 1:
-        form_variance = np.var(player.recent_points)
+        # Cached on the player, since risk is recomputed along the bid path
+        form_variance = player.recent_points_stats[1]
         form_risk = min(form_variance / 25.0, 1.0)  # Normalize and cap
     
     # Weighted combination
@@ -192,7 +425,47 @@ def calculate_risk_score(player: Player) -> float:
         0.10 * form_risk
     )
     
-    return max(0.0, min(1.0, risk_score))
+    return clip01(risk_score)
+
+
+def calculate_risk_scores(packed: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Vectorized calculate_risk_score over packed players.
+    
+    Args:
+        packed: Arrays from pack_players
+    
+    Returns:
+        Array of risk scores (0-1, where higher = more risky)
+    """
+    # Availability and playing time risk
+    availability_risk = 1.0 - calculate_availability_scores(packed)
+    minutes_per_game, played = _playing_time(packed)
+    playing_time_risk = np.where(played, np.maximum(0, 1.0 - minutes_per_game / 90.0), 0.8)
+    
+    # Price volatility risk: std of valid relative price changes
+    history, history_len = packed["price_history"], packed["price_history_len"]
+    previous = history[:, 1:]
+    valid = (np.arange(1, history.shape[1]) < history_len[:, None]) & (previous > 0)
+    changes = np.abs(history[:, :-1] - previous)
+    np.divide(changes, previous, out=changes, where=valid)
+    changes[~valid] = 0.0
+    n_changes = valid.sum(axis=1)
+    safe_n = np.maximum(n_changes, 1)
+    mean_change = changes.sum(axis=1) / safe_n
+    changes -= mean_change[:, None]
+    changes[~valid] = 0.0
+    np.square(changes, out=changes)
+    volatility = np.sqrt(changes.sum(axis=1) / safe_n)
+    volatility_risk = np.where(n_changes > 0, np.minimum(volatility * 10, 1.0), 0.0)
+    
+    # Form consistency risk: variance of recent points
+    form_risk = np.where(packed["recent_len"] > 1, np.minimum(packed["recent_var"] / 25.0, 1.0), 0.0)
+    
+    # Weighted combination as one dot product over the stacked components
+    risk_score = RISK_WEIGHTS @ np.stack((availability_risk, playing_time_risk, volatility_risk, form_risk))
+    
+    return clip01(risk_score)
 
 
 def get_position_scarcity_multiplier(position: Position) -> float:
@@ -206,14 +479,7 @@ def get_position_scarcity_multiplier(position: Position) -> float:
     Returns:
         Scarcity multiplier (1.0 = neutral)
     """
-    multipliers = {
-        Position.PORTERO: 0.9,  # Goalkeepers generally cheaper
-        Position.DEFENSA: 1.0,  # Neutral
-        Position.CENTROCAMPISTA: 1.1,  # Slightly premium
-        Position.DELANTERO: 1.2  # Premium for goal scorers
-    }
-    
-    return multipliers.get(position, 1.0)
+    return POSITION_SCARCITY_MULTIPLIERS.get(position, 1.0)
 
 
 def calculate_momentum_score(recent_points: List[int]) -> float:
@@ -229,16 +495,20 @@ def calculate_momentum_score(recent_points: List[int]) -> float:
     if len(recent_points) < 3:
         return 0.0
     
-    # Calculate trend using linear regression slope
-    x = np.arange(len(recent_points))
-    y = np.array(recent_points[::-1])  # Reverse to get chronological order
+    # Calculate trend using linear regression slope over chronological order
+    # (x = 0..n-1 oldest to newest). Sums over x have closed forms and the rest
+    # is integer arithmetic, so plain Python avoids NumPy dispatch per player.
+    n = len(recent_points)
+    sum_x = n * (n - 1) // 2
+    sum_x2 = (n - 1) * n * (2 * n - 1) // 6
+    sum_y = sum(recent_points)
+    sum_xy = sum(map(mul, range(n - 1, -1, -1), recent_points))
     
     # Simple slope calculation
-    n = len(recent_points)
-    slope = (n * np.sum(x * y) - np.sum(x) * np.sum(y)) / (n * np.sum(x**2) - np.sum(x)**2)
+    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
     
     # Normalize slope to -1 to 1 range
-    momentum = np.tanh(slope / 3.0)  # tanh to bound between -1 and 1
+    momentum = math.tanh(slope / 3.0)  # tanh to bound between -1 and 1
     
     return momentum
 
@@ -256,16 +526,15 @@ def calculate_consistency_score(recent_points: List[int]) -> float:
     if len(recent_points) < 2:
         return 0.5  # Default moderate consistency
     
-    variance = np.var(recent_points)
-    mean_points = np.mean(recent_points)
+    mean_points, variance = mean_variance(recent_points)
     
     if mean_points == 0:
         return 0.0
     
     # Coefficient of variation (lower = more consistent)
-    cv = np.sqrt(variance) / mean_points
+    cv = math.sqrt(variance) / mean_points
     
     # Convert to 0-1 scale (higher = more consistent)
-    consistency = np.exp(-cv)
+    consistency = math.exp(-cv)
     
-    return max(0.0, min(1.0, consistency))
\ No newline at end of file
+    return clip01(consistency)
\ No newline at end of file
@@ -2,8 +2,11 @@
 Forecasting engine for predicting expected points.
 """
 
+import math
 import numpy as np
-from typing import Dict, List
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, List, Tuple
 from .schemas import Player, Position
 from .features import (
     calculate_form_score, 
@@ -11,7 +14,10 @@ from .features import (
     calculate_availability_score,
     get_position_scarcity_multiplier,
     calculate_momentum_score,
-    FDR_TABLE
+    FDR_TABLE,
+    pack_players,
+    calculate_form_scores,
+    calculate_availability_scores
 )
 
 
@@ -23,6 +29,29 @@ BASE_POINTS_BY_POSITION = {
     Position.DELANTERO: 5.1
 }
 
+# Fixture sensitivity by position (how strongly fixture difficulty moves points)
+FIXTURE_SENSITIVITY_BY_POSITION = {
+    Position.PORTERO: 0.8,      # Goalkeepers less affected by fixtures
+    Position.DEFENSA: 1.0,      # Defenders moderately affected
+    Position.CENTROCAMPISTA: 1.1,  # Midfielders more affected
+    Position.DELANTERO: 1.2     # Forwards most affected by fixtures
+}
+
+# Default per-gameweek points variance by position (used without recent form)
+DEFAULT_VARIANCE_BY_POSITION = {
+    Position.PORTERO: 4.0,
+    Position.DEFENSA: 6.0,
+    Position.CENTROCAMPISTA: 8.0,
+    Position.DELANTERO: 10.0
+}
+
+# Two-sided z-scores by confidence level
+Z_SCORES = {0.8: 1.28, 0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+# Position lookup tables indexed by Player.position_index, for batch forecasting
+_BASE_POINTS_ARRAY = np.array([BASE_POINTS_BY_POSITION[p] for p in Position])
+_FIXTURE_SENSITIVITY_ARRAY = np.array([FIXTURE_SENSITIVITY_BY_POSITION[p] for p in Position])
+
 
 def calculate_base_points_per_game(player: Player) -> float:
     """
@@ -76,7 +105,33 @@ def apply_form_adjustment(base_points: float, player: Player) -> float:
     
     adjusted_points = base_points * form_multiplier * momentum_adjustment
     
-    return max(0.0, adjusted_points)
+    return adjusted_points if adjusted_points > 0.0 else 0.0
+
+
+@lru_cache(maxsize=4096)
+def fixture_multiplier(fixtures: Tuple[str, ...], position: Position) -> float:
+    """
+    Points multiplier for a run of fixtures, memoized on fixtures and position.
+    
+    Players from the same club share fixture runs, so across a market only a
+    few distinct (fixtures, position) pairs are ever evaluated.
+    
+    Args:
+        fixtures: Non-empty tuple of upcoming opponent team names
+        position: Player position
+    
+    Returns:
+        Fixture multiplier applied to points per game
+    """
+    avg_difficulty = calculate_fixture_difficulty(fixtures)
+    
+    # Convert difficulty (1-5) to adjustment factor
+    # Difficulty 1 = 1.2x points, Difficulty 5 = 0.7x points, Difficulty 3 = 1.0x
+    difficulty_multiplier = 1.45 - (avg_difficulty * 0.15)
+    
+    # Apply position-specific fixture sensitivity
+    sensitivity = FIXTURE_SENSITIVITY_BY_POSITION.get(position, 1.0)
+    return 1.0 + (difficulty_multiplier - 1.0) * sensitivity
 
 
 def apply_fixture_adjustment(points_per_game: float, player: Player, gameweeks: int = 3) -> float:
@@ -97,24 +152,7 @@ def apply_fixture_adjustment(points_per_game: float, player: Player, gameweeks:
     if not fixtures_to_consider:
         return points_per_game
     
-    avg_difficulty = calculate_fixture_difficulty(fixtures_to_consider)
-    
-    # Convert difficulty (1-5) to adjustment factor
-    # Difficulty 1 = 1.2x points, Difficulty 5 = 0.7x points, Difficulty 3 = 1.0x
-    difficulty_multiplier = 1.45 - (avg_difficulty * 0.15)
-    
-    # Apply position-specific fixture sensitivity
-    position_sensitivity = {
-        Position.PORTERO: 0.8,      # Goalkeepers less affected by fixtures
-        Position.DEFENSA: 1.0,      # Defenders moderately affected
-        Position.CENTROCAMPISTA: 1.1,  # Midfielders more affected
-        Position.DELANTERO: 1.2     # Forwards most affected by fixtures
-    }
-    
-    sensitivity = position_sensitivity.get(player.position, 1.0)
-    adjusted_multiplier = 1.0 + (difficulty_multiplier - 1.0) * sensitivity
-    
-    return points_per_game * adjusted_multiplier
+    return points_per_game * fixture_multiplier(tuple(fixtures_to_consider), player.position)
 
 
 def apply_availability_adjustment(points_per_game: float, player: Player) -> float:
@@ -169,45 +207,132 @@ def expected_points_next_k(player: Player, k: int = 3, fdr_table: Dict[str, int]
     # Step 5: Calculate total for k gameweeks
     total_expected_points = final_ppg * k
     
-    return max(0.0, total_expected_points)
+    return total_expected_points if total_expected_points > 0.0 else 0.0
 
 
-def expected_points_confidence_interval(player: Player, k: int = 3, confidence: float = 0.8) -> tuple:
+def expected_points_batch(players: List[Player], k: int = 3, alpha: float = 0.3,
+                          packed: Dict[str, np.ndarray] = None) -> np.ndarray:
     """
-    Calculate confidence interval for expected points prediction.
+    Vectorized expected_points_next_k over a batch of players.
+    
+    Runs the same pipeline (base points, form and momentum, fixtures,
+    availability) as whole-array operations instead of per-player calls.
+    
+    Args:
+        players: List of Player objects
+        k: Number of gameweeks to predict (default 3)
+        alpha: EMA smoothing factor for the form score
+        packed: Arrays from pack_players(players, k), if already built
+    
+    Returns:
+        Array of total expected points for next k gameweeks, in player order
+    """
+    a = packed if packed is not None else pack_players(players, k)
+    recent, recent_len = a["recent"], a["recent_len"]
+    gp = a["games_played"]
+    played = gp > 0
+    
+    # Step 1: Base points per game (historical weighted with position baseline)
+    position_baseline = np.take(_BASE_POINTS_ARRAY, a["position"])
+    weight_historical = np.where(gp >= 5, 0.8, 0.5)
+    historical_ppg = np.divide(a["total_points"], gp, out=np.zeros(len(gp)), where=played)
+    base_ppg = np.where(
+        played,
+        weight_historical * historical_ppg + (1 - weight_historical) * position_baseline,
+        position_baseline
+    )
+    
+    # Step 2: Form (EMA over recent points, most recent first) and momentum
+    form_score = calculate_form_scores(recent, recent_len, alpha)
+    
+    # Momentum: least-squares slope over chronological points (x = 0..len-1)
+    cols = np.arange(recent.shape[1])
+    x = np.where(cols < recent_len[:, None], recent_len[:, None] - 1 - cols, 0)
+    sum_x = recent_len * (recent_len - 1) // 2
+    sum_x2 = (recent_len - 1) * recent_len * (2 * recent_len - 1) // 6
+    sum_y = a["recent_sum"]
+    sum_xy = (x * recent).sum(axis=1)
+    has_trend = recent_len >= 3
+    denominator = np.where(has_trend, recent_len * sum_x2 - sum_x ** 2, 1)
+    slope = (recent_len * sum_xy - sum_x * sum_y) / denominator
+    momentum = np.where(has_trend, np.tanh(slope / 3.0), 0.0)
+    
+    # From here on the multipliers are applied in place on a single ppg buffer
+    # (same evaluation order as the scalar path, no per-step temporaries)
+    form_multiplier = np.divide(form_score, 10.0, out=form_score)
+    form_multiplier += 0.5
+    momentum_adjustment = np.multiply(momentum, 0.2, out=momentum)
+    momentum_adjustment += 1.0
+    ppg = base_ppg
+    ppg *= form_multiplier
+    ppg *= momentum_adjustment
+    np.maximum(ppg, 0.0, out=ppg)
+    
+    # Step 3: Fixture difficulty adjustment (players without fixtures unchanged)
+    fixture_count = a["fixture_count"]
+    has_fixtures = fixture_count > 0
+    avg_difficulty = np.divide(
+        a["fixture_sum"], fixture_count, out=np.zeros(len(fixture_count)), where=has_fixtures
+    )
+    difficulty_multiplier = 1.45 - (avg_difficulty * 0.15)
+    sensitivity = np.take(_FIXTURE_SENSITIVITY_ARRAY, a["position"])
+    adjusted_multiplier = difficulty_multiplier
+    adjusted_multiplier -= 1.0
+    adjusted_multiplier *= sensitivity
+    adjusted_multiplier += 1.0
+    adjusted_multiplier[~has_fixtures] = 1.0
+    ppg *= adjusted_multiplier
+    
+    # Step 4: Availability adjustment
+    ppg *= calculate_availability_scores(a)
+    
+    # Step 5: Total for k gameweeks
+    ppg *= k
+    return np.maximum(ppg, 0.0, out=ppg)
+
+
+def expected_points_std(player: Player, k: int = 3) -> float:
+    """
+    Standard deviation of points over the next k gameweeks.
     
     Args:
         player: Player object
         k: Number of gameweeks
-        confidence: Confidence level (0.8 = 80%)
     
     Returns:
-        Tuple of (lower_bound, expected, upper_bound)
+        Standard deviation in points
     """
-    expected = expected_points_next_k(player, k)
-    
     # Calculate variance based on recent performance and position
     if len(player.recent_points) >= 2:
-        recent_variance = np.var(player.recent_points)
+        recent_variance = player.recent_points_stats[1]
     else:
         # Default variance by position
-        position_variance = {
-            Position.PORTERO: 4.0,
-            Position.DEFENSA: 6.0,
-            Position.CENTROCAMPISTA: 8.0,
-            Position.DELANTERO: 10.0
-        }
-        recent_variance = position_variance.get(player.position, 8.0)
+        recent_variance = DEFAULT_VARIANCE_BY_POSITION.get(player.position, 8.0)
     
     # Scale variance by number of gameweeks
     total_variance = recent_variance * k
-    std_dev = np.sqrt(total_variance)
+    return math.sqrt(total_variance)
+
+
+def expected_points_confidence_interval(player: Player, k: int = 3, confidence: float = 0.8) -> tuple:
+    """
+    Calculate confidence interval for expected points prediction.
+    
+    Args:
+        player: Player object
+        k: Number of gameweeks
+        confidence: Confidence level (0.8 = 80%)
+    
+    Returns:
+        Tuple of (lower_bound, expected, upper_bound)
+    """
+    expected = expected_points_next_k(player, k)
+    std_dev = expected_points_std(player, k)
     
     # Calculate confidence interval
     # For 80% confidence, use ±1.28 standard deviations
     # For 95% confidence, use ±1.96 standard deviations
-    z_scores = {0.8: 1.28, 0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
-    z_score = z_scores.get(confidence, 1.28)
+    z_score = Z_SCORES.get(confidence, 1.28)
     
     margin = z_score * std_dev
     lower_bound = max(0.0, expected - margin)
@@ -216,24 +341,21 @@ def expected_points_confidence_interval(player: Player, k: int = 3, confidence:
     return (lower_bound, expected, upper_bound)
 
 
-def batch_forecast_players(players: List[Player], k: int = 3) -> Dict[int, float]:
+def batch_forecast_players(players: List[Player], k: int = 3,
+                           packed: Dict[str, np.ndarray] = None) -> Dict[int, float]:
     """
     Batch forecast expected points for multiple players.
     
     Args:
         players: List of Player objects
         k: Number of gameweeks to predict
+        packed: Arrays from pack_players(players, k), if already built
     
     Returns:
         Dictionary mapping player_id to expected points
     """
-    forecasts = {}
-    
-    for player in players:
-        expected_pts = expected_points_next_k(player, k)
-        forecasts[player.id] = expected_pts
-    
-    return forecasts
+    expected = expected_points_batch(players, k, packed=packed)
+    return dict(zip(map(attrgetter("id"), players), expected.tolist()))
 
 
 def calculate_points_per_million(player: Player, k: int = 3) -> float:
@@ -254,25 +376,28 @@ def calculate_points_per_million(player: Player, k: int = 3) -> float:
     return expected_pts / player.price
 
 
-def rank_players_by_value(players: List[Player], k: int = 3) -> List[tuple]:
+def rank_players_by_value(players: List[Player], k: int = 3,
+                          packed: Dict[str, np.ndarray] = None) -> List[tuple]:
     """
     Rank players by value (points per million).
     
     Args:
         players: List of Player objects
         k: Number of gameweeks for forecasting
+        packed: Arrays from pack_players(players, k), if already built
     
     Returns:
         List of tuples (player, expected_points, points_per_million) sorted by value
     """
-    player_values = []
-    
-    for player in players:
-        expected_pts = expected_points_next_k(player, k)
-        ppm = calculate_points_per_million(player, k)
-        player_values.append((player, expected_pts, ppm))
-    
-    # Sort by points per million (descending)
-    player_values.sort(key=lambda x: x[2], reverse=True)
-    
-    return player_values
\ No newline at end of file
+    # Forecast all players in one batch and derive points per million from it
+    if packed is None:
+        packed = pack_players(players, k)
+    expected = expected_points_batch(players, k, packed=packed)
+    prices = packed["price"]
+    points_per_million = np.divide(expected, prices, out=np.zeros_like(expected), where=prices > 0)
+    
+    # Sort by points per million (descending, stable for ties)
+    order = np.argsort(-points_per_million, kind="stable")
+    expected = expected.tolist()
+    points_per_million = points_per_million.tolist()
+    return [(players[i], expected[i], points_per_million[i]) for i in order.tolist()]
\ No newline at end of file
@@ -5,10 +5,76 @@ Functions to load and normalize data from official Fantasy backend.
 
 import json
 import os
-from typing import List, Dict, Any, Optional
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterator
 from pathlib import Path
+from pydantic import TypeAdapter, ValidationError
 from .schemas import Player, TeamState, Market, RivalTeam, Position, PlayerStatus
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; files are parsed with the stdlib json otherwise
+    orjson = None
+
+try:
+    import rapidjson
+except ImportError:  # python-rapidjson is optional; sample files are written with the stdlib json otherwise
+    rapidjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; streaming loads fall back to parsing the whole file
+    ijson = None
+
+# Parses JSON from bytes (orjson only accepts bytes; json.loads detects the encoding)
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Serializes to pretty-printed JSON text (same layout from either library)
+_dumps_pretty = partial(rapidjson.dumps if rapidjson is not None else json.dumps, indent=2, ensure_ascii=False)
+
+# Validates a whole list of normalized player fields in one call
+_PLAYER_LIST_ADAPTER = TypeAdapter(List[Player])
+
+# Top-level keys that may hold the player list, in lookup order
+_PLAYER_LIST_KEYS = ('players', 'elements', 'data')
+
+# Number of raw players decoded and validated together when streaming
+_STREAM_CHUNK_SIZE = 1000
+
+# Marks a value absent from the raw JSON, as opposed to an explicit null
+_MISSING = object()
+
+# Position names used by the supported Fantasy APIs (lowercase) mapped to Position
+POSITION_MAPPING = {
+    "portero": Position.PORTERO,
+    "defensa": Position.DEFENSA,
+    "centrocampista": Position.CENTROCAMPISTA,
+    "delantero": Position.DELANTERO,
+    "goalkeeper": Position.PORTERO,
+    "defender": Position.DEFENSA,
+    "midfielder": Position.CENTROCAMPISTA,
+    "forward": Position.DELANTERO,
+    "gk": Position.PORTERO,
+    "def": Position.DEFENSA,
+    "mid": Position.CENTROCAMPISTA,
+    "att": Position.DELANTERO
+}
+
+# Player status names (English and Spanish, lowercase) mapped to PlayerStatus
+STATUS_MAPPING = {
+    "available": PlayerStatus.AVAILABLE,
+    "disponible": PlayerStatus.AVAILABLE,
+    "injured": PlayerStatus.INJURED,
+    "lesionado": PlayerStatus.INJURED,
+    "suspended": PlayerStatus.SUSPENDED,
+    "sancionado": PlayerStatus.SUSPENDED,
+    "doubtful": PlayerStatus.DOUBTFUL,
+    "duda": PlayerStatus.DOUBTFUL
+}
+
 
 def load_json_file(file_path: str) -> Dict[str, Any]:
     """
@@ -24,11 +90,38 @@ def load_json_file(file_path: str) -> Dict[str, Any]:
         FileNotFoundError: If file doesn't exist
         json.JSONDecodeError: If JSON is invalid
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"JSON file not found: {file_path}")
+    return _loads(_read_json_bytes(file_path))
+
+
+def _read_json_bytes(file_path: str) -> bytes:
+    """
+    Read the raw bytes of a JSON file.
+    
+    Args:
+        file_path: Path to JSON file
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    Returns:
+        File contents
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+    """
+    try:
+        return Path(file_path).read_bytes()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"JSON file not found: {file_path}") from None
+
+
+def _write_json_file(data: Any, file_path: str) -> None:
+    """
+    Write data to file as pretty-printed UTF-8 JSON.
+    
+    Args:
+        data: JSON-serializable data
+        file_path: Path to write
+    """
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(_dumps_pretty(data))
 
 
 def normalize_position(position_str: str) -> Position:
@@ -41,23 +134,7 @@ def normalize_position(position_str: str) -> Position:
     Returns:
         Position enum value
     """
-    position_mapping = {
-        "portero": Position.PORTERO,
-        "defensa": Position.DEFENSA,
-        "centrocampista": Position.CENTROCAMPISTA,
-        "delantero": Position.DELANTERO,
-        "goalkeeper": Position.PORTERO,
-        "defender": Position.DEFENSA,
-        "midfielder": Position.CENTROCAMPISTA,
-        "forward": Position.DELANTERO,
-        "gk": Position.PORTERO,
-        "def": Position.DEFENSA,
-        "mid": Position.CENTROCAMPISTA,
-        "att": Position.DELANTERO
-    }
-    
-    normalized = position_str.lower().strip()
-    return position_mapping.get(normalized, Position.CENTROCAMPISTA)
+    return POSITION_MAPPING.get(position_str.lower().strip(), Position.CENTROCAMPISTA)
 
 
 def normalize_player_status(status_str: str) -> PlayerStatus:
@@ -70,19 +147,7 @@ def normalize_player_status(status_str: str) -> PlayerStatus:
     Returns:
         PlayerStatus enum value
     """
-    status_mapping = {
-        "available": PlayerStatus.AVAILABLE,
-        "disponible": PlayerStatus.AVAILABLE,
-        "injured": PlayerStatus.INJURED,
-        "lesionado": PlayerStatus.INJURED,
-        "suspended": PlayerStatus.SUSPENDED,
-        "sancionado": PlayerStatus.SUSPENDED,
-        "doubtful": PlayerStatus.DOUBTFUL,
-        "duda": PlayerStatus.DOUBTFUL
-    }
-    
-    normalized = status_str.lower().strip()
-    return status_mapping.get(normalized, PlayerStatus.AVAILABLE)
+    return STATUS_MAPPING.get(status_str.lower().strip(), PlayerStatus.AVAILABLE)
 
 
 def parse_player_from_json(player_data: Dict[str, Any]) -> Player:
@@ -95,6 +160,43 @@ def parse_player_from_json(player_data: Dict[str, Any]) -> Player:
     Returns:
         Player object
     """
+    return Player(**_player_fields(player_data))
+
+
+def _coerce_float(value: Any, field: str, default: float = 0.0) -> float:
+    """
+    Convert a raw numeric JSON value to float.
+    
+    Values that are present but cannot be parsed (including null) fall back to
+    the default with a warning, so the substitution is visible.
+    
+    Args:
+        value: Number or numeric string from JSON, or _MISSING if absent
+        field: Name of the value in warnings
+        default: Value returned for missing or unparseable input
+    
+    Returns:
+        Float value
+    """
+    if value is _MISSING:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        print(f"Warning: Failed to parse {field} {value!r}, using {default}")
+        return default
+
+
+def _player_fields(player_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize raw player data from JSON into Player field values.
+    
+    Args:
+        player_data: Raw player data from JSON
+    
+    Returns:
+        Dictionary of Player keyword arguments (not yet validated)
+    """
     # Handle different possible field names from various Fantasy APIs
     player_id = player_data.get('id') or player_data.get('player_id') or player_data.get('element')
     name = player_data.get('name') or player_data.get('web_name') or player_data.get('display_name')
@@ -107,15 +209,10 @@ def parse_player_from_json(player_data: Dict[str, Any]) -> Player:
         player_data.get('pos') or 
         "centrocampista"
     )
-    position = normalize_position(str(position_raw))
+    position = POSITION_MAPPING.get(str(position_raw).lower().strip(), Position.CENTROCAMPISTA)
     
     # Price (handle different formats)
-    price = player_data.get('price', 0.0)
-    if isinstance(price, str):
-        try:
-            price = float(price)
-        except ValueError:
-            price = 0.0
+    price = _coerce_float(player_data.get('price', _MISSING), 'player price')
     # Some APIs return price in tenths (e.g., 85 = 8.5M)
     if price > 50:
         price = price / 10.0
@@ -128,7 +225,7 @@ def parse_player_from_json(player_data: Dict[str, Any]) -> Player:
     
     # Status
     status_raw = player_data.get('status', 'available')
-    availability = normalize_player_status(str(status_raw))
+    availability = STATUS_MAPPING.get(str(status_raw).lower().strip(), PlayerStatus.AVAILABLE)
     
     # Playing time
     minutes_played = player_data.get('minutes', 0) or player_data.get('minutes_played', 0)
@@ -149,18 +246,18 @@ def parse_player_from_json(player_data: Dict[str, Any]) -> Player:
         next_fixtures = []
     
     # Calculate form if not provided
-    form = player_data.get('form', 0.0)
+    form = _coerce_float(player_data.get('form', _MISSING), 'player form')
     if form == 0.0 and recent_points:
         form = sum(recent_points) / len(recent_points)
     
-    return Player(
+    return dict(
         id=int(player_id),
         name=str(name),
-        team=str(team),
+        team=sys.intern(str(team)),
         position=position,
-        price=float(price),
+        price=price,
         total_points=int(total_points),
-        form=float(form),
+        form=form,
         availability=availability,
         minutes_played=int(minutes_played),
         games_played=int(games_played),
@@ -170,43 +267,183 @@ def parse_player_from_json(player_data: Dict[str, Any]) -> Player:
     )
 
 
-def load_players_from_json(file_path: str) -> List[Player]:
+def parse_players_from_json(players_data: List[Dict[str, Any]], label: str = "player") -> List[Player]:
+    """
+    Parse a list of raw players, validating them all in one batch.
+    
+    Rows that cannot be parsed are skipped with a warning. If any normalized row
+    fails validation, the batch is validated row by row instead so that only
+    the invalid rows are dropped.
+    
+    Args:
+        players_data: Raw player data from JSON
+        label: Name of the data in warnings
+    
+    Returns:
+        List of Player objects
+    """
+    fields = []
+    for player_data in players_data:
+        try:
+            fields.append(_player_fields(player_data))
+        except Exception as e:
+            print(f"Warning: Failed to parse {label} data: {e}")
+    
+    try:
+        return _PLAYER_LIST_ADAPTER.validate_python(fields)
+    except ValidationError:
+        pass
+    
+    players = []
+    for player_fields in fields:
+        try:
+            players.append(Player(**player_fields))
+        except ValidationError as e:
+            print(f"Warning: Failed to parse {label} data: {e}")
+    
+    return players
+
+
+def load_players_from_json(file_path: str, stream: bool = False) -> List[Player]:
     """
     Load players from JSON file.
     
     Args:
         file_path: Path to JSON file containing player data
+        stream: Decode the player list incrementally instead of parsing the
+            whole file first, which lowers peak memory on very large files
+            (requires ijson; the file is parsed eagerly without it)
     
     Returns:
         List of Player objects
     """
-    data = load_json_file(file_path)
+    if stream and ijson is not None:
+        return list(_stream_players(file_path))
     
-    # Handle different JSON structures
-    players_data = []
+    return _players_from_data(load_json_file(file_path))
+
+
+def _stream_players(file_path: str) -> Iterator[Player]:
+    """
+    Stream players from a JSON file, decoding and validating them in chunks.
+    
+    The player list is the root array or, in a root object, the 'players',
+    'elements' or 'data' list with the same precedence as the eager parse.
+    Any other layout (a single player object, or a candidate key holding
+    something other than a list) is parsed eagerly so it behaves the same.
+    
+    Args:
+        file_path: Path to JSON file containing player data
+    
+    Yields:
+        Player objects in file order
+    
+    Raises:
+        FileNotFoundError: If file doesn't exist
+    """
+    try:
+        f = open(file_path, 'rb')
+    except FileNotFoundError:
+        raise FileNotFoundError(f"JSON file not found: {file_path}") from None
+    
+    with f:
+        # Scan the root for candidate keys and the type of their values; the
+        # scan can stop early only once the highest precedence key is found
+        prefix = None
+        value_events = {}
+        events = ijson.parse(f)
+        for path, event, value in events:
+            if path == '' and event == 'start_array':
+                prefix = 'item'
+                break
+            if path == '' and event == 'map_key' and value in _PLAYER_LIST_KEYS:
+                value_events[value] = next(events)[1]
+                if value == _PLAYER_LIST_KEYS[0]:
+                    break
+        
+        if prefix is None:
+            key = next((key for key in _PLAYER_LIST_KEYS if key in value_events), None)
+            if key is not None and value_events[key] == 'start_array':
+                prefix = f'{key}.item'
+        
+        f.seek(0)
+        if prefix is None:
+            yield from _players_from_data(_loads(f.read()))
+            return
+        
+        players_data = ijson.items(f, prefix, use_float=True)
+        while True:
+            chunk = list(islice(players_data, _STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            yield from parse_players_from_json(chunk)
+
+
+def load_players_from_json_batch(file_paths: List[str], max_workers: Optional[int] = None) -> List[Player]:
+    """
+    Load players from several JSON files into a single list.
+    
+    Files are read in a thread pool (file reads release the GIL) and each
+    one is decoded and validated as soon as its contents are available, in
+    file order. Worker processes are not used: pickling validated Player
+    objects back to the caller costs more than parsing them.
+    
+    Args:
+        file_paths: Paths to player JSON files
+        max_workers: Maximum number of reader threads (None for the default)
+    
+    Returns:
+        List of Player objects from all files
+    """
+    players = []
+    
+    if len(file_paths) <= 1:
+        for path in file_paths:
+            players.extend(load_players_from_json(path))
+        return players
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for raw in executor.map(_read_json_bytes, file_paths):
+            players.extend(_players_from_data(_loads(raw)))
+    
+    return players
+
+
+def _players_from_data(data: Any) -> List[Player]:
+    """
+    Parse players from already-decoded JSON data.
+    
+    Args:
+        data: Decoded JSON (a list of players or an object containing them)
+    
+    Returns:
+        List of Player objects
+    """
+    return parse_players_from_json(_player_records(data))
+
+
+def _player_records(data: Any) -> List[Dict[str, Any]]:
+    """
+    Extract the raw player records from decoded JSON data.
+    
+    Args:
+        data: Decoded JSON (a list of players or an object containing them)
     
+    Returns:
+        List of raw player dictionaries
+    """
+    # Handle different JSON structures
     if isinstance(data, list):
-        players_data = data
+        return data
     elif 'players' in data:
-        players_data = data['players']
+        return data['players']
     elif 'elements' in data:  # FPL-style API
-        players_data = data['elements']
+        return data['elements']
     elif 'data' in data:
-        players_data = data['data']
+        return data['data']
     else:
         # Assume the root object contains player data
-        players_data = [data]
-    
-    players = []
-    for player_data in players_data:
-        try:
-            player = parse_player_from_json(player_data)
-            players.append(player)
-        except Exception as e:
-            print(f"Warning: Failed to parse player data: {e}")
-            continue
-    
-    return players
+        return [data]
 
 
 def load_team_state_from_json(file_path: str) -> TeamState:
@@ -223,20 +460,12 @@ def load_team_state_from_json(file_path: str) -> TeamState:
     
     # Extract players
     players_data = data.get('players', data.get('picks', data.get('team', [])))
-    players = []
-    
-    for player_data in players_data:
-        try:
-            player = parse_player_from_json(player_data)
-            players.append(player)
-        except Exception as e:
-            print(f"Warning: Failed to parse team player data: {e}")
-            continue
+    players = parse_players_from_json(players_data, label="team player")
     
     # Extract financial data
-    bankroll = float(data.get('bankroll', data.get('bank', data.get('money_available', 0.0))))
-    total_value = float(data.get('total_value', data.get('team_value', 0.0)))
-    weekly_budget = float(data.get('weekly_budget', data.get('transfer_budget', 0.0)))
+    bankroll = _coerce_float(data.get('bankroll', data.get('bank', data.get('money_available', _MISSING))), 'bankroll')
+    total_value = _coerce_float(data.get('total_value', data.get('team_value', _MISSING)), 'total value')
+    weekly_budget = _coerce_float(data.get('weekly_budget', data.get('transfer_budget', _MISSING)), 'weekly budget')
     transfers_made = int(data.get('transfers_made', data.get('transfers_this_week', 0)))
     
     # Calculate total value if not provided
@@ -264,8 +493,8 @@ def load_market_from_json(file_path: str) -> Market:
     """
     data = load_json_file(file_path)
     
-    # Load available players
-    available_players = load_players_from_json(file_path)
+    # Load available players from the same parsed data
+    available_players = _players_from_data(data)
     
     # Extract trending data
     trending_up = data.get('trending_up', data.get('price_risers', []))
@@ -338,7 +567,7 @@ def load_rivals_from_json(file_path: str) -> List[RivalTeam]:
                     player_ids.append(int(player_id))
             
             total_points = int(rival_data.get('total_points', 0))
-            team_value = float(rival_data.get('team_value', 0.0))
+            team_value = _coerce_float(rival_data.get('team_value', _MISSING), 'rival team value')
             
             rivals.append(RivalTeam(
                 team_id=team_id,
@@ -424,8 +653,7 @@ def create_sample_data_files(data_dir: str = None):
     ]
     
     # Save sample players
-    with open(os.path.join(data_dir, 'sample_players.json'), 'w', encoding='utf-8') as f:
-        json.dump(sample_players, f, indent=2, ensure_ascii=False)
+    _write_json_file(sample_players, os.path.join(data_dir, 'sample_players.json'))
     
     # Sample team state
     sample_team = {
@@ -436,8 +664,7 @@ def create_sample_data_files(data_dir: str = None):
         "transfers_made": 1
     }
     
-    with open(os.path.join(data_dir, 'sample_team.json'), 'w', encoding='utf-8') as f:
-        json.dump(sample_team, f, indent=2, ensure_ascii=False)
+    _write_json_file(sample_team, os.path.join(data_dir, 'sample_team.json'))
     
     # Sample market
     sample_market = {
@@ -448,8 +675,7 @@ def create_sample_data_files(data_dir: str = None):
         "most_transferred_out": [2]
     }
     
-    with open(os.path.join(data_dir, 'sample_market.json'), 'w', encoding='utf-8') as f:
-        json.dump(sample_market, f, indent=2, ensure_ascii=False)
+    _write_json_file(sample_market, os.path.join(data_dir, 'sample_market.json'))
     
     # Sample rivals
     sample_rivals = [
@@ -469,8 +695,7 @@ def create_sample_data_files(data_dir: str = None):
         }
     ]
     
-    with open(os.path.join(data_dir, 'sample_rivals.json'), 'w', encoding='utf-8') as f:
-        json.dump(sample_rivals, f, indent=2, ensure_ascii=False)
+    _write_json_file(sample_rivals, os.path.join(data_dir, 'sample_rivals.json'))
     
     print(f"Sample data files created in: {data_dir}")
 
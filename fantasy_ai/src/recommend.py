@@ -4,45 +4,73 @@ Analyzes teams, market, and provides actionable recommendations.
 """
 
 from typing import List, Dict, Tuple
+from collections import Counter
+from operator import attrgetter, itemgetter
+from dataclasses import dataclass
 import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional; one-to-one swaps fall back to greedy matching
+    linear_sum_assignment = None
+
 from .schemas import (
-    Player, TeamState, Market, RivalTeam, Position, PlayerAnalysis, 
-    TeamAnalysis, MarketAnalysis, SwapRecommendation, BidRecommendation,
+    Player, TeamState, Market, RivalTeam, Position, POSITION_INDEX, PlayerAnalysis, 
+    TeamAnalysis, MarketAnalysis, MarketTrends, SwapRecommendation, BidRecommendation,
     DifferentialAnalysis, RecommendationResponse
 )
-from .forecast import expected_points_next_k, calculate_points_per_million
+from .forecast import expected_points_next_k, expected_points_batch
 from .economics import (
-    calculate_fair_value, calculate_max_bid, calculate_bid_range,
-    calculate_expected_roi, calculate_market_timing_score
+    calculate_fair_value, calculate_fair_values, calculate_max_bid, calculate_bid_ranges,
+    calculate_portfolio_kelly, calculate_expected_roi, calculate_market_timing_score, sample_bid_returns
+)
+from .features import (
+    calculate_risk_score, calculate_risk_scores, calculate_form_score,
+    calculate_form_scores, pack_players, clip01
 )
-from .features import calculate_risk_score, calculate_form_score
 
+# Bid risk levels: scores below RISK_LEVEL_THRESHOLDS[i] get RISK_LEVELS[i]
+RISK_LEVEL_THRESHOLDS = (0.3, 0.6)
+RISK_LEVELS = ("Low", "Medium", "High")
 
-def analyze_player(player: Player, bankroll: float = 10.0) -> PlayerAnalysis:
+# Swap risk labels, indexed by how many bounds the risk improvement clears
+# (>= -0.2, then > 0.2), which keeps both outer bands strict
+SWAP_RISK_LABELS = ("Higher risk", "Similar risk", "Lower risk")
+
+# Recommended squad composition by position
+RECOMMENDED_POSITION_COUNTS = {
+    Position.PORTERO: 2,
+    Position.DEFENSA: 5,
+    Position.CENTROCAMPISTA: 5,
+    Position.DELANTERO: 3
+}
+
+
+def _build_player_analysis(player_id: int, expected_points: float, value_ratio: float,
+                           form_score: float, risk_score: float, fair_value: float) -> PlayerAnalysis:
     """
-    Perform comprehensive analysis of a single player.
+    Assemble a PlayerAnalysis from precomputed metrics.
     
     Args:
-        player: Player object
-        bankroll: Available bankroll for context
+        player_id: Player id
+        expected_points: Expected points next 3 gameweeks
+        value_ratio: Expected points per million spent
+        form_score: Form score (0-10)
+        risk_score: Risk score (0-1)
+        fair_value: Fair value in millions
     
     Returns:
         PlayerAnalysis object with all metrics
     """
-    expected_points = expected_points_next_k(player, 3)
-    form_score = calculate_form_score(player.recent_points)
-    risk_score = calculate_risk_score(player)
-    fair_value = calculate_fair_value(player)
-    value_ratio = calculate_points_per_million(player, 3)
-    
     # Availability score (inverse of risk components)
     availability_score = max(0.0, 1.0 - risk_score)
     
     # Fixture difficulty (simplified)
     fixture_difficulty = 3.0  # Default neutral, would be calculated from fixtures
     
-    return PlayerAnalysis(
-        player_id=player.id,
+    # All fields are computed internally, so skip pydantic validation
+    return PlayerAnalysis.model_construct(
+        player_id=player_id,
         expected_points_next_3=expected_points,
         form_score=form_score,
         fixture_difficulty=fixture_difficulty,
@@ -53,61 +81,144 @@ def analyze_player(player: Player, bankroll: float = 10.0) -> PlayerAnalysis:
     )
 
 
-def analyze_myteam(team_state: TeamState) -> TeamAnalysis:
+def analyze_player(player: Player, bankroll: float = 10.0) -> PlayerAnalysis:
+    """
+    Perform comprehensive analysis of a single player.
+    
+    Args:
+        player: Player object
+        bankroll: Available bankroll for context
+    
+    Returns:
+        PlayerAnalysis object with all metrics
+    """
+    expected_points = expected_points_next_k(player, 3)
+    value_ratio = expected_points / player.price if player.price > 0 else 0.0
+    
+    # Scoring functions return Python floats, except that a single recent score
+    # comes back as the raw int points
+    return _build_player_analysis(
+        player.id,
+        expected_points,
+        value_ratio,
+        float(calculate_form_score(player.recent_points)),
+        calculate_risk_score(player),
+        calculate_fair_value(player)
+    )
+
+
+def analyze_players(players: List[Player], bankroll: float = 10.0) -> List[PlayerAnalysis]:
+    """
+    Analyze several players at once.
+    
+    Players are packed into arrays once, and expected points, form, risk, fair
+    value and value ratio are all computed as whole-array operations.
+    
+    Args:
+        players: List of Player objects
+        bankroll: Available bankroll for context
+    
+    Returns:
+        List of PlayerAnalysis objects in the same order as players
+    """
+    packed = pack_players(players, 3)
+    expected = expected_points_batch(players, 3, packed=packed)
+    prices = packed["price"]
+    value_ratio = np.divide(expected, prices, out=np.zeros(len(players)), where=prices > 0)
+    form_scores = calculate_form_scores(packed["recent"], packed["recent_len"])
+    risk_scores = calculate_risk_scores(packed)
+    fair_values = calculate_fair_values(packed, expected)
+    
+    return [
+        _build_player_analysis(player.id, *metrics)
+        for player, *metrics in zip(
+            players, expected.tolist(), value_ratio.tolist(), form_scores.tolist(),
+            risk_scores.tolist(), fair_values.tolist()
+        )
+    ]
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Select the indices of the k largest scores without a full sort.
+    
+    Partitions to find the k-th largest score, then sorts only the survivors.
+    Ties keep their original order, matching heapq.nlargest.
+    
+    Args:
+        scores: Score per item
+        k: Number of items to keep
+    
+    Returns:
+        Indices of the top k scores, highest first
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth_largest = np.partition(scores, n - k)[n - k]
+        candidates = np.flatnonzero(scores >= kth_largest)
+    else:
+        candidates = np.arange(n)
+    order = np.argsort(-scores[candidates], kind="stable")[:k]
+    return candidates[order]
+
+
+def analyze_myteam(team_state: TeamState, analyses: List[PlayerAnalysis] = None) -> TeamAnalysis:
     """
     Analyze user's current team and identify strengths/weaknesses.
     
     Args:
         team_state: Current team state
+        analyses: Precomputed analyses of team_state.players, in order (optional)
     
     Returns:
         TeamAnalysis with players to sell/keep and team balance assessment
     """
-    players_to_sell = []
-    players_to_keep = []
-    position_counts = {pos: 0 for pos in Position}
-    
-    # Analyze each player
-    for player in team_state.players:
-        analysis = analyze_player(player, team_state.bankroll)
-        
-        # Count positions
-        position_counts[player.position] += 1
-        
-        # Decision criteria for selling
-        should_sell = (
-            analysis.risk_score > 0.7 or  # High risk
-            analysis.form_score < 3.0 or  # Poor form
-            analysis.value_ratio < 1.5 or  # Poor value
-            analysis.expected_points_next_3 < 6.0  # Low expected points
+    if analyses is None:
+        analyses = analyze_players(team_state.players, team_state.bankroll)
+    n = len(analyses)
+    
+    # Gather metrics and position ordinals in a single pass so the sell decision
+    # and aggregates run in NumPy
+    metrics = np.empty((4, n))
+    pos_idx = np.empty(n, dtype=np.intp)
+    for i, (player, analysis) in enumerate(zip(team_state.players, analyses)):
+        metrics[:, i] = (
+            analysis.risk_score,
+            analysis.form_score,
+            analysis.value_ratio,
+            analysis.expected_points_next_3
         )
-        
-        if should_sell:
-            players_to_sell.append(analysis)
-        else:
-            players_to_keep.append(analysis)
+        pos_idx[i] = player.position_index
+    risk, form, value_ratio, expected = metrics
+    
+    # Decision criteria for selling
+    should_sell = (
+        (risk > 0.7) |  # High risk
+        (form < 3.0) |  # Poor form
+        (value_ratio < 1.5) |  # Poor value
+        (expected < 6.0)  # Low expected points
+    )
+    players_to_sell = [analyses[i] for i in np.flatnonzero(should_sell)]
+    players_to_keep = [analyses[i] for i in np.flatnonzero(~should_sell)]
     
-    # Identify weak positions (fewer than recommended)
-    recommended_counts = {
-        Position.PORTERO: 2,
-        Position.DEFENSA: 5,
-        Position.CENTROCAMPISTA: 5,
-        Position.DELANTERO: 3
-    }
+    # Count positions
+    position_counts = np.bincount(pos_idx, minlength=len(POSITION_INDEX))
     
-    weak_positions = []
-    for position, recommended in recommended_counts.items():
-        if position_counts[position] < recommended:
-            weak_positions.append(position)
+    # Identify weak positions (fewer than recommended)
+    weak_positions = [
+        position for position, recommended in RECOMMENDED_POSITION_COUNTS.items()
+        if position_counts[POSITION_INDEX[position]] < recommended
+    ]
     
     # Calculate team balance score
-    total_expected = sum(p.expected_points_next_3 for p in players_to_keep + players_to_sell)
-    avg_risk = np.mean([p.risk_score for p in players_to_keep + players_to_sell]) if team_state.players else 0.5
+    avg_risk = float(risk.mean()) if n else 0.5
     position_balance = len(weak_positions) / len(Position)  # 0 = perfect, 1 = all positions weak
     
-    team_balance_score = max(0.0, min(1.0, 1.0 - position_balance - avg_risk * 0.3))
+    team_balance_score = clip01(1.0 - position_balance - avg_risk * 0.3)
     
-    return TeamAnalysis(
+    return TeamAnalysis.model_construct(
         players_to_sell=players_to_sell,
         players_to_keep=players_to_keep,
         weak_positions=weak_positions,
@@ -115,72 +226,66 @@ def analyze_myteam(team_state: TeamState) -> TeamAnalysis:
     )
 
 
-def analyze_market(market: Market, top_n: int = 20) -> MarketAnalysis:
+def analyze_market(market: Market, top_n: int = 20, 
+                   analyses: List[PlayerAnalysis] = None) -> MarketAnalysis:
     """
     Analyze market to identify best buys, overpriced players, and bargains.
     
     Args:
         market: Market state with available players
         top_n: Number of top players to return in each category
+        analyses: Precomputed analyses of market.available_players, in order (optional)
     
     Returns:
         MarketAnalysis with categorized player recommendations
     """
-    all_analyses = []
-    
     # Analyze all available players
-    for player in market.available_players:
-        analysis = analyze_player(player)
-        all_analyses.append(analysis)
-    
-    # Sort by different criteria
-    by_value_ratio = sorted(all_analyses, key=lambda x: x.value_ratio, reverse=True)
-    by_expected_points = sorted(all_analyses, key=lambda x: x.expected_points_next_3, reverse=True)
-    by_fair_value_ratio = sorted(all_analyses, key=lambda x: x.fair_value / 
-                                 next(p.price for p in market.available_players if p.id == x.player_id), 
-                                 reverse=True)
-    
-    # Best buys: High value ratio + good expected points + low risk
-    best_buys = []
-    for analysis in by_value_ratio[:top_n * 2]:  # Consider top candidates
-        player = next(p for p in market.available_players if p.id == analysis.player_id)
-        if (analysis.value_ratio > 2.0 and 
-            analysis.expected_points_next_3 > 8.0 and 
-            analysis.risk_score < 0.5):
-            best_buys.append(analysis)
-    best_buys = best_buys[:top_n]
+    all_analyses = analyses if analyses is not None else analyze_players(market.available_players)
+    n = len(all_analyses)
+    
+    # Gather the metrics used for classification so selection runs in NumPy
+    metrics = np.empty((6, n))
+    for i, (analysis, player) in enumerate(zip(all_analyses, market.available_players)):
+        metrics[:, i] = (
+            analysis.value_ratio,
+            analysis.expected_points_next_3,
+            analysis.risk_score,
+            analysis.form_score,
+            analysis.fair_value,
+            player.price
+        )
+    value_ratio, expected, risk, form, fair_value, price = metrics
+    
+    # Best buys: High value ratio + good expected points + low risk,
+    # considering only the top value ratios as candidates
+    best_buys = [
+        all_analyses[i] for i in _top_k_indices(value_ratio, top_n * 2)
+        if value_ratio[i] > 2.0 and expected[i] > 8.0 and risk[i] < 0.5
+    ][:top_n]
+    
+    fair_value_ratio = np.divide(fair_value, price, out=np.zeros(n), where=price > 0)
     
     # Overpriced: High price relative to fair value + poor value ratio
-    overpriced = []
-    for analysis in all_analyses:
-        player = next(p for p in market.available_players if p.id == analysis.player_id)
-        fair_value_ratio = analysis.fair_value / player.price if player.price > 0 else 0
-        if fair_value_ratio < 0.8 and analysis.value_ratio < 1.5:
-            overpriced.append(analysis)
-    overpriced = sorted(overpriced, key=lambda x: x.value_ratio)[:top_n]
+    is_overpriced = (fair_value_ratio < 0.8) & (value_ratio < 1.5)
+    overpriced_idx = np.flatnonzero(is_overpriced)
+    overpriced_idx = overpriced_idx[_top_k_indices(-value_ratio[overpriced_idx], top_n)]
+    overpriced = [all_analyses[i] for i in overpriced_idx]
     
     # Bargains: Underpriced relative to fair value but good potential
-    bargains = []
-    for analysis in all_analyses:
-        player = next(p for p in market.available_players if p.id == analysis.player_id)
-        fair_value_ratio = analysis.fair_value / player.price if player.price > 0 else 0
-        if (fair_value_ratio > 1.2 and 
-            analysis.expected_points_next_3 > 6.0 and 
-            analysis.form_score > 4.0):
-            bargains.append(analysis)
-    bargains = sorted(bargains, key=lambda x: x.fair_value / 
-                      next(p.price for p in market.available_players if p.id == x.player_id), 
-                      reverse=True)[:top_n]
-    
-    # Market trends (simplified)
-    market_trends = {
-        "avg_value_ratio": np.mean([a.value_ratio for a in all_analyses]),
-        "avg_risk_score": np.mean([a.risk_score for a in all_analyses]),
-        "high_value_count": len([a for a in all_analyses if a.value_ratio > 3.0]),
+    is_bargain = ~is_overpriced & (fair_value_ratio > 1.2) & (expected > 6.0) & (form > 4.0)
+    bargain_idx = np.flatnonzero(is_bargain)
+    bargain_idx = bargain_idx[_top_k_indices(fair_value_ratio[bargain_idx], top_n)]
+    bargains = [all_analyses[i] for i in bargain_idx]
+    
+    # Market trends (simplified), kept at full precision; display layers format them
+    market_trends: MarketTrends = {
+        "avg_value_ratio": float(value_ratio.mean()) if n else float("nan"),
+        "avg_risk_score": float(risk.mean()) if n else float("nan"),
+        "high_value_count": int(np.count_nonzero(value_ratio > 3.0)),
         "bargain_count": len(bargains)
     }
     
-    return MarketAnalysis(
+    return MarketAnalysis.model_construct(
         best_buys=best_buys,
         overpriced=overpriced,
         bargains=bargains,
@@ -188,7 +293,109 @@ def analyze_market(market: Market, top_n: int = 20) -> MarketAnalysis:
     )
 
 
-def recommend_swaps(team_state: TeamState, market: Market, max_recommendations: int = 10) -> List[SwapRecommendation]:
+def _analyze_team_and_market(team_state: TeamState, market: Market) -> Tuple[TeamAnalysis, MarketAnalysis]:
+    """
+    Analyze team and market players in one batch, then split the results.
+    
+    Args:
+        team_state: Current team state
+        market: Market state
+    
+    Returns:
+        Tuple of (TeamAnalysis, MarketAnalysis)
+    """
+    n_team = len(team_state.players)
+    analyses = analyze_players(team_state.players + market.available_players, team_state.bankroll)
+    
+    team_analysis = analyze_myteam(team_state, analyses[:n_team])
+    market_analysis = analyze_market(market, analyses=analyses[n_team:])
+    return team_analysis, market_analysis
+
+
+@dataclass
+class _SwapCandidate:
+    """Buy-side fields read by the swap scoring loop, flattened into slots."""
+    __slots__ = ("rank", "player_id", "price", "expected_points", "risk_score", "value_ratio", "form_score")
+    rank: int
+    player_id: int
+    price: float
+    expected_points: float
+    risk_score: float
+    value_ratio: float
+    form_score: float
+
+
+def _assign_swaps(swaps: List[SwapRecommendation], scores: np.ndarray) -> List[int]:
+    """
+    Reduce candidate swaps to a conflict-free set.
+    
+    Each player is sold at most once and each market player bought at most once,
+    maximizing the total swap score with an optimal assignment when scipy is
+    available and picking greedily by score otherwise.
+    
+    Args:
+        swaps: Candidate swaps (at most one per sell/buy pair)
+        scores: Ranking score of each swap
+    
+    Returns:
+        Indices of the chosen swaps
+    """
+    if linear_sum_assignment is None or len(swaps) < 2:
+        chosen = []
+        sold, bought = set(), set()
+        for i in np.argsort(-scores, kind="stable").tolist():
+            swap = swaps[i]
+            if swap.sell_player_id not in sold and swap.buy_player_id not in bought:
+                sold.add(swap.sell_player_id)
+                bought.add(swap.buy_player_id)
+                chosen.append(i)
+        return chosen
+    
+    sell_index = {pid: i for i, pid in enumerate(dict.fromkeys(s.sell_player_id for s in swaps))}
+    buy_index = {pid: j for j, pid in enumerate(dict.fromkeys(s.buy_player_id for s in swaps))}
+    
+    # Pairs without a candidate swap (e.g. different positions) score 0 and are dropped
+    pairs = [(sell_index[swap.sell_player_id], buy_index[swap.buy_player_id]) for swap in swaps]
+    score_matrix = np.zeros((len(sell_index), len(buy_index)))
+    score_matrix[tuple(zip(*pairs))] = scores
+    swap_by_pair = {pair: i for i, pair in enumerate(pairs)}
+    
+    rows, cols = linear_sum_assignment(score_matrix, maximize=True)
+    return [swap_by_pair[pair] for pair in zip(rows.tolist(), cols.tolist()) if pair in swap_by_pair]
+
+
+def _fit_swaps_to_budget(swaps: List[SwapRecommendation], chosen: List[int],
+                         bankroll: float) -> List[int]:
+    """
+    Drop the lowest ranked swaps that cost money until the set is affordable.
+    
+    Swaps that free up money are always kept, since dropping them never helps.
+    
+    Args:
+        swaps: Candidate swaps
+        chosen: Indices of conflict-free swaps, best first
+        bankroll: Money available for the net cost of all swaps
+    
+    Returns:
+        Indices of the kept swaps, best first
+    """
+    total_cost = sum(swaps[i].cost_difference for i in chosen)
+    dropped = set()
+    for i in reversed(chosen):
+        if total_cost <= bankroll:
+            break
+        cost_difference = swaps[i].cost_difference
+        if cost_difference > 0:
+            dropped.add(i)
+            total_cost -= cost_difference
+    
+    return [i for i in chosen if i not in dropped]
+
+
+def recommend_swaps(team_state: TeamState, market: Market, max_recommendations: int = 10,
+                    team_analysis: TeamAnalysis = None,
+                    market_analysis: MarketAnalysis = None,
+                    one_to_one: bool = False) -> List[SwapRecommendation]:
     """
     Recommend player swaps (sell + buy combinations).
     
@@ -196,85 +403,108 @@ def recommend_swaps(team_state: TeamState, market: Market, max_recommendations:
         team_state: Current team state
         market: Market state
         max_recommendations: Maximum number of swap recommendations
+        team_analysis: Precomputed analysis of team_state (optional)
+        market_analysis: Precomputed analysis of market (optional)
+        one_to_one: Only return swaps that can all be made together (no player
+            sold or bought twice and their combined cost within the bankroll)
     
     Returns:
         List of SwapRecommendation objects
     """
-    team_analysis = analyze_myteam(team_state)
-    market_analysis = analyze_market(market)
+    if team_analysis is None and market_analysis is None:
+        team_analysis, market_analysis = _analyze_team_and_market(team_state, market)
+    if team_analysis is None:
+        team_analysis = analyze_myteam(team_state)
+    if market_analysis is None:
+        market_analysis = analyze_market(market)
+    
+    # Index players by id once instead of scanning lists per lookup
+    market_by_id = {p.id: p for p in market.available_players}
+    team_by_id = {p.id: p for p in team_state.players}
+    
+    # Bucket replacement candidates (best buys, then bargains) by position once,
+    # keeping each candidate's rank so swaps are emitted in candidate order
+    candidates_by_position = {}
+    seen_ids = set()
+    for analysis in market_analysis.best_buys + market_analysis.bargains:
+        if analysis.player_id in seen_ids:
+            continue
+        seen_ids.add(analysis.player_id)
+        buy_player = market_by_id[analysis.player_id]
+        candidates_by_position.setdefault(buy_player.position, []).append(_SwapCandidate(
+            len(seen_ids), buy_player.id, buy_player.price, analysis.expected_points_next_3,
+            analysis.risk_score, analysis.value_ratio, analysis.form_score
+        ))
+    
+    # Cheapest first, so the affordability scan can stop at the first miss
+    for candidates in candidates_by_position.values():
+        candidates.sort(key=attrgetter("price"))
     
-    swap_recommendations = []
+    # Swaps and their ranking scores (expected points gain weighted by confidence),
+    # scored once when each swap is built
+    swaps = []
+    scores = []
     
     # Consider each player to sell
+    bankroll = team_state.bankroll
     for sell_candidate in team_analysis.players_to_sell:
-        sell_player = next(p for p in team_state.players if p.id == sell_candidate.player_id)
+        sell_player = team_by_id[sell_candidate.player_id]
+        sell_id, sell_price = sell_player.id, sell_player.price
+        sell_expected, sell_risk = sell_candidate.expected_points_next_3, sell_candidate.risk_score
+        matches = []
         
-        # Find potential replacements in same position
-        position_targets = [
-            p for p in market.available_players 
-            if p.position == sell_player.position and p.price <= sell_player.price * 1.2
-        ]
-        
-        # Also consider players from best buys and bargains
-        target_ids = set()
-        for buy_list in [market_analysis.best_buys, market_analysis.bargains]:
-            for analysis in buy_list:
-                buy_player = next(p for p in market.available_players if p.id == analysis.player_id)
-                if buy_player.position == sell_player.position:
-                    target_ids.add(analysis.player_id)
-        
-        # Analyze each potential swap
-        for target_id in target_ids:
-            buy_player = next(p for p in market.available_players if p.id == target_id)
-            buy_analysis = next(a for a in market_analysis.best_buys + market_analysis.bargains 
-                               if a.player_id == target_id)
+        # Analyze each affordable swap in the same position
+        for candidate in candidates_by_position.get(sell_player.position, []):
+            cost_difference = candidate.price - sell_price
+            if cost_difference > bankroll:
+                break
             
-            cost_difference = buy_player.price - sell_player.price
+            expected_points_gain = candidate.expected_points - sell_expected
             
-            # Check if affordable
-            if cost_difference <= team_state.bankroll:
-                expected_points_gain = (buy_analysis.expected_points_next_3 - 
-                                       sell_candidate.expected_points_next_3)
-                
-                # Risk assessment
-                risk_improvement = sell_candidate.risk_score - buy_analysis.risk_score
-                if risk_improvement > 0.2:
-                    risk_assessment = "Lower risk"
-                elif risk_improvement < -0.2:
-                    risk_assessment = "Higher risk"
-                else:
-                    risk_assessment = "Similar risk"
-                
-                # Calculate confidence based on multiple factors
-                confidence = min(1.0, max(0.0, (
-                    0.4 * (expected_points_gain / 10.0) +  # Points improvement
-                    0.3 * (buy_analysis.value_ratio / 4.0) +  # Value ratio
-                    0.2 * risk_improvement +  # Risk improvement
-                    0.1 * (buy_analysis.form_score / 10.0)  # Form score
-                )))
-                
-                # Only recommend if there's clear benefit
-                if expected_points_gain > 2.0 or (expected_points_gain > 0 and risk_improvement > 0.1):
-                    swap_recommendations.append(SwapRecommendation(
-                        sell_player_id=sell_player.id,
-                        buy_player_id=buy_player.id,
-                        expected_points_gain=expected_points_gain,
-                        cost_difference=cost_difference,
-                        risk_assessment=risk_assessment,
-                        confidence=confidence
-                    ))
-    
-    # Sort by expected points gain and confidence
-    swap_recommendations.sort(
-        key=lambda x: x.expected_points_gain * x.confidence, 
-        reverse=True
-    )
-    
-    return swap_recommendations[:max_recommendations]
+            # Risk assessment
+            risk_improvement = sell_risk - candidate.risk_score
+            risk_assessment = SWAP_RISK_LABELS[(risk_improvement >= -0.2) + (risk_improvement > 0.2)]
+            
+            # Calculate confidence based on multiple factors
+            confidence = clip01(
+                0.4 * (expected_points_gain / 10.0) +  # Points improvement
+                0.3 * (candidate.value_ratio / 4.0) +  # Value ratio
+                0.2 * risk_improvement +  # Risk improvement
+                0.1 * (candidate.form_score / 10.0)  # Form score
+            )
+            
+            # Only recommend if there's clear benefit
+            if expected_points_gain > 2.0 or (expected_points_gain > 0 and risk_improvement > 0.1):
+                swap = SwapRecommendation.model_construct(
+                    sell_player_id=sell_id,
+                    buy_player_id=candidate.player_id,
+                    expected_points_gain=expected_points_gain,
+                    cost_difference=cost_difference,
+                    risk_assessment=risk_assessment,
+                    confidence=confidence
+                )
+                matches.append((candidate.rank, expected_points_gain * confidence, swap))
+        
+        matches.sort(key=itemgetter(0))
+        for _, score, swap in matches:
+            scores.append(score)
+            swaps.append(swap)
+    scores = np.array(scores, dtype=float)
+    
+    if one_to_one:
+        chosen = np.array(_assign_swaps(swaps, scores), dtype=np.intp)
+        chosen = chosen[_top_k_indices(scores[chosen], max_recommendations)]
+        return [swaps[i] for i in _fit_swaps_to_budget(swaps, chosen.tolist(), bankroll)]
+    
+    # Top swaps by expected points gain and confidence (no need to sort the tail)
+    return [swaps[i] for i in _top_k_indices(scores, max_recommendations)]
 
 
 def recommend_bids(team_state: TeamState, market: Market, 
-                   target_players: List[int] = None) -> List[BidRecommendation]:
+                   target_players: List[int] = None,
+                   market_analysis: MarketAnalysis = None,
+                   portfolio_kelly: bool = False,
+                   sampled_returns: bool = False) -> List[BidRecommendation]:
     """
     Recommend bidding ranges for target players.
     
@@ -282,58 +512,104 @@ def recommend_bids(team_state: TeamState, market: Market,
         team_state: Current team state
         market: Market state
         target_players: Specific player IDs to analyze (if None, uses market analysis)
+        market_analysis: Precomputed analysis of market (optional)
+        portfolio_kelly: Size bids jointly across all targets from the shared
+            bankroll instead of with per-player Kelly
+        sampled_returns: With portfolio_kelly, size bids on Monte Carlo returns
+            from the forecast distribution instead of two-outcome bets
     
     Returns:
         List of BidRecommendation objects
     """
+    # Player analyses by id, reused from the market analysis when available
+    analysis_by_id = {}
+    
     if target_players is None:
         # Use best buys and bargains from market analysis
-        market_analysis = analyze_market(market)
+        if market_analysis is None:
+            market_analysis = analyze_market(market)
         target_players = []
         for analysis in market_analysis.best_buys + market_analysis.bargains:
             target_players.append(analysis.player_id)
+            analysis_by_id[analysis.player_id] = analysis
+    
+    market_by_id = {p.id: p for p in market.available_players}
+    targets = [market_by_id[player_id] for player_id in target_players if player_id in market_by_id]
+    
+    # Analyze any targets not covered by the market analysis in one batch
+    missing = list({p.id: p for p in targets if p.id not in analysis_by_id}.values())
+    analysis_by_id.update(zip((p.id for p in missing), analyze_players(missing, team_state.bankroll)))
+    
+    # Calculate all bid ranges and risk levels in one array pass
+    n = len(targets)
+    prices = np.fromiter((p.price for p in targets), dtype=float, count=n)
+    fair_values = np.fromiter((analysis_by_id[p.id].fair_value for p in targets), dtype=float, count=n)
+    risk_scores = np.fromiter((analysis_by_id[p.id].risk_score for p in targets), dtype=float, count=n)
+    kelly_fractions = None
+    if portfolio_kelly:
+        samples = sample_bid_returns(targets) if sampled_returns else None
+        kelly_fractions = calculate_portfolio_kelly(prices, fair_values, risk_scores, team_state.bankroll,
+                                                    samples=samples)
+    min_bids, fair_values, max_bids = calculate_bid_ranges(
+        prices,
+        fair_values,
+        risk_scores,
+        team_state.bankroll,
+        market_pressure=0.5,  # Could be calculated from market data
+        risk_tolerance=0.5,   # Could be user preference
+        kelly_fractions=kelly_fractions
+    )
+    risk_levels = np.searchsorted(RISK_LEVEL_THRESHOLDS, risk_scores, side="right")
     
-    bid_recommendations = []
+    # Market pressure (simplified - could be enhanced with real market data)
+    market_pressure = 0.5  # Default neutral pressure
     
-    for player_id in target_players:
-        player = next((p for p in market.available_players if p.id == player_id), None)
-        if not player:
-            continue
-        
-        # Calculate bid range
-        min_bid, fair_value, max_bid = calculate_bid_range(
-            player, 
-            team_state.bankroll,
-            market_pressure=0.5,  # Could be calculated from market data
-            risk_tolerance=0.5    # Could be user preference
-        )
-        
-        # Risk assessment
-        risk_score = calculate_risk_score(player)
-        if risk_score < 0.3:
-            risk_level = "Low"
-        elif risk_score < 0.6:
-            risk_level = "Medium"
-        else:
-            risk_level = "High"
-        
-        # Market pressure (simplified - could be enhanced with real market data)
-        market_pressure = 0.5  # Default neutral pressure
-        
-        bid_recommendations.append(BidRecommendation(
-            player_id=player_id,
+    return [
+        BidRecommendation.model_construct(
+            player_id=player.id,
             min_bid=min_bid,
             max_bid=max_bid,
             fair_value=fair_value,
-            risk_level=risk_level,
+            risk_level=RISK_LEVELS[risk_level],
             market_pressure=market_pressure
-        ))
+        )
+        for player, min_bid, max_bid, fair_value, risk_level in zip(
+            targets, min_bids.tolist(), max_bids.tolist(), fair_values.tolist(), risk_levels.tolist()
+        )
+    ]
+
+
+def _differential_scores(expected: np.ndarray, ownership: np.ndarray,
+                         value_ratio: np.ndarray, risk: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score differential candidates in a single array pass.
+    
+    Args:
+        expected: Expected points next 3 gameweeks per candidate
+        ownership: Rival ownership fraction (0-1) per candidate
+        value_ratio: Points per million per candidate
+        risk: Risk score (0-1) per candidate
     
-    return bid_recommendations
+    Returns:
+        Tuple of (differential_value, risk_reward_ratio) arrays
+    """
+    # Differential value (higher = better differential), capping value ratio impact
+    differential_value = np.subtract(1.0, ownership)
+    differential_value *= expected
+    value_factor = np.divide(value_ratio, 2.0)
+    np.minimum(value_factor, 2.0, out=value_factor)
+    differential_value *= value_factor
+    
+    # Risk-reward ratio
+    risk_reward_ratio = np.maximum(risk, 0.1)
+    np.divide(expected, risk_reward_ratio, out=risk_reward_ratio)
+    
+    return differential_value, risk_reward_ratio
 
 
 def find_differentials(team_state: TeamState, market: Market, 
-                      rivals: List[RivalTeam], min_ownership_threshold: float = 0.3) -> List[DifferentialAnalysis]:
+                      rivals: List[RivalTeam], min_ownership_threshold: float = 0.3,
+                      market_analysis: MarketAnalysis = None) -> List[DifferentialAnalysis]:
     """
     Find differential players - good options that rivals don't have.
     
@@ -342,6 +618,7 @@ def find_differentials(team_state: TeamState, market: Market,
         market: Market state
         rivals: List of rival teams
         min_ownership_threshold: Minimum ownership % to exclude from differentials
+        market_analysis: Precomputed analysis of market (optional)
     
     Returns:
         List of DifferentialAnalysis objects
@@ -349,49 +626,48 @@ def find_differentials(team_state: TeamState, market: Market,
     if not rivals:
         return []
     
-    # Calculate ownership percentages for each player
+    # Calculate ownership percentages for each player, indexing rival rosters once
     total_rivals = len(rivals)
-    player_ownership = {}
-    
-    for player in market.available_players:
-        owned_by = sum(1 for rival in rivals if player.id in rival.players)
-        ownership_pct = owned_by / total_rivals
-        player_ownership[player.id] = ownership_pct
+    owned_by = Counter(player_id for rival in rivals for player_id in set(rival.players))
+    player_ownership = {
+        player.id: owned_by[player.id] / total_rivals
+        for player in market.available_players
+    }
     
     # Find players with low ownership but good potential
-    differentials = []
-    market_analysis = analyze_market(market)
-    
-    # Consider players from best buys and bargains with low ownership
-    potential_differentials = market_analysis.best_buys + market_analysis.bargains
-    
-    for analysis in potential_differentials:
-        ownership_pct = player_ownership.get(analysis.player_id, 0.0)
-        
-        # Only consider if ownership is below threshold
-        if ownership_pct <= min_ownership_threshold:
-            player = next(p for p in market.available_players if p.id == analysis.player_id)
-            
-            # Calculate differential value (higher = better differential)
-            differential_value = (
-                analysis.expected_points_next_3 * (1.0 - ownership_pct) * 
-                min(analysis.value_ratio / 2.0, 2.0)  # Cap value ratio impact
-            )
-            
-            # Risk-reward ratio
-            risk_reward_ratio = analysis.expected_points_next_3 / max(analysis.risk_score, 0.1)
-            
-            differentials.append(DifferentialAnalysis(
-                player_id=analysis.player_id,
-                ownership_percentage=ownership_pct * 100,  # Convert to percentage
-                differential_value=differential_value,
-                risk_reward_ratio=risk_reward_ratio
-            ))
-    
-    # Sort by differential value
-    differentials.sort(key=lambda x: x.differential_value, reverse=True)
+    if market_analysis is None:
+        market_analysis = analyze_market(market)
     
-    return differentials[:15]  # Return top 15 differentials
+    # Consider players from best buys and bargains with ownership below threshold
+    candidates = [
+        analysis for analysis in market_analysis.best_buys + market_analysis.bargains
+        if player_ownership.get(analysis.player_id, 0.0) <= min_ownership_threshold
+    ]
+    n = len(candidates)
+    
+    ownership = np.fromiter((player_ownership.get(a.player_id, 0.0) for a in candidates), dtype=float, count=n)
+    expected = np.fromiter((a.expected_points_next_3 for a in candidates), dtype=float, count=n)
+    value_ratio = np.fromiter((a.value_ratio for a in candidates), dtype=float, count=n)
+    risk = np.fromiter((a.risk_score for a in candidates), dtype=float, count=n)
+    
+    differential_values, risk_reward_ratios = _differential_scores(expected, ownership, value_ratio, risk)
+    
+    # Keep the top 15 differentials by differential value before assembling results
+    top = _top_k_indices(differential_values, 15)
+    
+    # Values are produced internally, so skip re-validation on assembly
+    return [
+        DifferentialAnalysis.model_construct(
+            player_id=analysis.player_id,
+            ownership_percentage=ownership_pct * 100,  # Convert to percentage
+            differential_value=differential_value,
+            risk_reward_ratio=risk_reward_ratio
+        )
+        for analysis, ownership_pct, differential_value, risk_reward_ratio in zip(
+            [candidates[i] for i in top], ownership[top].tolist(),
+            differential_values[top].tolist(), risk_reward_ratios[top].tolist()
+        )
+    ]
 
 
 def generate_comprehensive_recommendations(
@@ -410,16 +686,17 @@ def generate_comprehensive_recommendations(
     Returns:
         Complete RecommendationResponse with all recommendations
     """
-    # Perform all analyses
-    team_analysis = analyze_myteam(team_state)
-    market_analysis = analyze_market(market)
-    swap_recommendations = recommend_swaps(team_state, market)
-    bid_recommendations = recommend_bids(team_state, market)
+    # Perform all analyses, analyzing every player once and sharing the results
+    team_analysis, market_analysis = _analyze_team_and_market(team_state, market)
+    swap_recommendations = recommend_swaps(
+        team_state, market, team_analysis=team_analysis, market_analysis=market_analysis
+    )
+    bid_recommendations = recommend_bids(team_state, market, market_analysis=market_analysis)
     
     # Find differentials if rivals provided
     differentials = []
     if rivals:
-        differentials = find_differentials(team_state, market, rivals)
+        differentials = find_differentials(team_state, market, rivals, market_analysis=market_analysis)
     
     # Generate summary
     summary_parts = []
@@ -441,7 +718,7 @@ def generate_comprehensive_recommendations(
     
     summary = " ".join(summary_parts) if summary_parts else "No major changes recommended."
     
-    return RecommendationResponse(
+    return RecommendationResponse.model_construct(
         team_analysis=team_analysis,
         market_analysis=market_analysis,
         swap_recommendations=swap_recommendations,
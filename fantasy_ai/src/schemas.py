@@ -2,10 +2,13 @@
 Pydantic schemas for Fantasy LaLiga data structures.
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Tuple
+from typing_extensions import TypedDict
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
+from operator import mul
 
 
 class Position(str, Enum):
@@ -24,8 +27,20 @@ class PlayerStatus(str, Enum):
     DOUBTFUL = "doubtful"
 
 
+# Ordinals used to index per-position / per-status arrays. Keyed by the plain
+# string values, which is what Player holds (use_enum_values), so lookups hash
+# and compare plain strings instead of going through the enum members.
+POSITION_INDEX = {position.value: i for i, position in enumerate(Position)}
+STATUS_INDEX = {status.value: i for i, status in enumerate(PlayerStatus)}
+
+# Player attributes derived from its fields and cached on the instance
+_PLAYER_DERIVED_ATTRIBUTES = ("position_index", "status_index", "recent_points_stats")
+
+
 class Player(BaseModel):
     """Player data model"""
+    model_config = ConfigDict(use_enum_values=True, frozen=True)
+    
     id: int
     name: str
     team: str
@@ -36,12 +51,48 @@ class Player(BaseModel):
     availability: PlayerStatus = Field(default=PlayerStatus.AVAILABLE)
     minutes_played: int = Field(default=0, description="Total minutes played this season")
     games_played: int = Field(default=0, description="Games played this season")
-    recent_points: List[int] = Field(default_factory=list, description="Points from last 5 games")
-    price_history: List[float] = Field(default_factory=list, description="Historical prices")
-    next_fixtures: List[str] = Field(default_factory=list, description="Next 3-5 fixture teams")
+    # Read-only sequences: immutable tuples share the empty default instead of
+    # allocating a fresh list per player
+    recent_points: Tuple[int, ...] = Field(default=(), description="Points from last 5 games")
+    price_history: Tuple[float, ...] = Field(default=(), description="Historical prices")
+    next_fixtures: Tuple[str, ...] = Field(default=(), description="Next 3-5 fixture teams")
+    
+    # Derived values are computed on first use and cached on the instance. The
+    # model is frozen so the fields they read cannot change afterwards, and
+    # model_copy drops them when it updates fields.
+    def model_copy(self, *, update: Optional[dict] = None, deep: bool = False) -> "Player":
+        """Copy the player, recomputing cached derived values if fields are updated."""
+        copied = super().model_copy(update=update, deep=deep)
+        if update:
+            for name in _PLAYER_DERIVED_ATTRIBUTES:
+                copied.__dict__.pop(name, None)
+        return copied
     
-    class Config:
-        use_enum_values = True
+    @cached_property
+    def position_index(self) -> int:
+        """Ordinal of the player's position in Position."""
+        return POSITION_INDEX[self.position]
+    
+    @cached_property
+    def status_index(self) -> int:
+        """Ordinal of the player's availability status in PlayerStatus."""
+        return STATUS_INDEX[self.availability]
+    
+    @cached_property
+    def recent_points_stats(self) -> Tuple[float, float]:
+        """
+        Mean and population variance of recent_points ((0.0, 0.0) if empty).
+        
+        Points are integers, so the sum and sum of squares are exact and the
+        variance needs only one pass (as in features.pack_players).
+        """
+        points = self.recent_points
+        n = len(points)
+        if not n:
+            return (0.0, 0.0)
+        total = sum(points)
+        total_sq = sum(map(mul, points, points))
+        return (total / n, (n * total_sq - total * total) / (n * n))
 
 
 class TeamState(BaseModel):
@@ -97,12 +148,20 @@ class TeamAnalysis(BaseModel):
     team_balance_score: float = Field(..., description="Team balance assessment (0-1)")
 
 
+class MarketTrends(TypedDict):
+    """Aggregate market indicators"""
+    avg_value_ratio: float
+    avg_risk_score: float
+    high_value_count: int
+    bargain_count: int
+
+
 class MarketAnalysis(BaseModel):
     """Market analysis results"""
     best_buys: List[PlayerAnalysis]
     overpriced: List[PlayerAnalysis]
     bargains: List[PlayerAnalysis]
-    market_trends: Dict[str, Any]
+    market_trends: MarketTrends
 
 
 class SwapRecommendation(BaseModel):
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the Fantasy LaLiga economic calculations.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from fantasy_ai.src import economics
+from fantasy_ai.src.forecast import expected_points_next_k
+from fantasy_ai.src.loaders import load_players_from_json, get_data_file_path
+from fantasy_ai.src.recommend import recommend_bids
+from fantasy_ai.src.schemas import Player, TeamState, Market
+
+
+def _player(player_id, price, position="Centrocampista"):
+    return Player(
+        id=player_id,
+        name=f"Player {player_id}",
+        team="Real Madrid",
+        position=position,
+        price=price,
+        total_points=6 * player_id,
+        minutes_played=720,
+        games_played=8,
+        recent_points=[player_id % 9, 6, 2, 8, 5],
+        next_fixtures=["Getafe", "Barcelona", "Cadiz"],
+    )
+
+
+def _log_growth(fractions, b, win_probability):
+    """Expected log-growth of two-outcome bets over all joint outcomes."""
+    growth = 0.0
+    for wins in itertools.product((True, False), repeat=len(b)):
+        wins = np.array(wins)
+        probability = np.where(wins, win_probability, 1.0 - win_probability).prod()
+        growth += probability * np.log(1.0 + np.where(wins, b, -1.0) @ fractions)
+    return growth
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_project_capped_simplex_stays_feasible(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.0, 1.0, size=rng.integers(1, 30))
+    cap = rng.uniform(0.05, 1.0)
+    
+    projected = economics._project_capped_simplex(values, cap)
+    
+    assert projected.min() >= 0.0
+    assert projected.max() <= cap
+    assert projected.sum() <= 1.0 + 1e-12
+    if np.clip(values, 0.0, cap).sum() > 1.0:
+        assert projected.sum() == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("price, fair_value, risk_score, bankroll", [
+    (10.0, 13.0, 0.4, 50.0),
+    (5.0, 6.0, 0.35, 100.0),
+    (8.0, 10.0, 0.45, 20.0),
+    (8.0, 10.0, 0.3, 50.0),  # Capped at 0.25
+    (4.0, 4.2, 0.7, 30.0),  # No edge
+])
+def test_portfolio_kelly_single_player_matches_kelly_fraction(price, fair_value, risk_score, bankroll):
+    fractions = economics.calculate_portfolio_kelly(
+        np.array([price]), np.array([fair_value]), np.array([risk_score]), bankroll
+    )
+    
+    win_probability = min(max(1.0 - risk_score, 0.1), 0.9)
+    expected = economics.calculate_kelly_fraction(
+        0.0, win_probability, 1.0 - win_probability,
+        fair_value - price, min(price * 0.3, bankroll * 0.1)
+    )
+    assert fractions[0] == pytest.approx(expected, abs=1e-6)
+
+
+def test_portfolio_kelly_beats_grid_over_three_players():
+    prices = np.array([8.0, 6.0, 10.0])
+    fair_values = np.array([10.0, 7.5, 11.0])
+    risk_scores = np.array([0.3, 0.4, 0.2])
+    bankroll = 40.0
+    
+    fractions = economics.calculate_portfolio_kelly(prices, fair_values, risk_scores, bankroll)
+    _, b, win_probability = economics._kelly_odds(prices, fair_values, risk_scores, bankroll)
+    
+    grid = np.linspace(0.0, 0.25, 26)
+    best = max(_log_growth(np.array(f), b, win_probability) for f in itertools.product(grid, repeat=3))
+    assert fractions.min() >= 0.0 and fractions.max() <= 0.25
+    assert _log_growth(fractions, b, win_probability) >= best - 1e-9
+
+
+def test_portfolio_kelly_skips_players_without_upside():
+    fractions = economics.calculate_portfolio_kelly(
+        np.array([8.0, 6.0]), np.array([7.0, 8.0]), np.array([0.3, 0.3]), 40.0
+    )
+    
+    assert fractions[0] == 0.0
+    assert fractions[1] > 0.0
+
+
+def test_kelly_sgd_zeroes_non_finite_columns():
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0.1, 0.3, size=(500, 4))
+    samples[3, 1] = np.nan
+    samples[7, 2] = np.inf
+    
+    fractions = economics.calculate_kelly_sgd(samples, n_iter=500)
+    
+    assert np.isfinite(fractions).all()
+    assert fractions[1] == 0.0 and fractions[2] == 0.0
+    assert fractions[0] > 0.0
+
+
+def test_kelly_sgd_without_samples_returns_zeros():
+    fractions = economics.calculate_kelly_sgd(np.empty((0, 3)))
+    
+    assert fractions.tolist() == [0.0, 0.0, 0.0]
+
+
+def test_sample_bid_returns_masks_unpriced_players():
+    players = [_player(1, 6.0), _player(2, 0.0), _player(3, 9.5)]
+    
+    returns = economics.sample_bid_returns(players, n_samples=200)
+    
+    assert returns.shape == (200, 3)
+    assert np.isfinite(returns).all()
+    assert (returns[:, 1] == 0.0).all()
+    assert economics.calculate_kelly_sgd(returns)[1] == 0.0
+
+
+def test_recommend_bids_with_sampled_returns():
+    team_state = TeamState(players=[_player(i, 5.0) for i in range(1, 4)], bankroll=30.0, total_value=15.0)
+    market = Market(available_players=[_player(i, 4.0 + i % 7) for i in range(10, 30)])
+    targets = [10, 11, 12, 13]
+    
+    bids = recommend_bids(team_state, market, target_players=targets,
+                          portfolio_kelly=True, sampled_returns=True)
+    
+    assert [bid.player_id for bid in bids] == targets
+    for bid in bids:
+        assert bid.min_bid <= bid.fair_value <= bid.max_bid
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 10])
+def test_memoized_forecast_matches_expected_points_next_k(k):
+    players = load_players_from_json(get_data_file_path("sample_players.json"))
+    
+    for player in players:
+        assert economics._expected_points(player, k) == expected_points_next_k(player, k)
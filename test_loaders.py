@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the Fantasy LaLiga JSON loaders.
+"""
+
+import json
+import re
+
+import pytest
+
+from fantasy_ai.src.loaders import (
+    load_json_file, load_players_from_json, load_players_from_json_batch, load_team_state_from_json,
+    parse_players_from_json
+)
+
+
+def _raw_player(player_id):
+    return {
+        "id": player_id,
+        "name": f"Player {player_id}",
+        "team": "Real Madrid",
+        "position": "Defensa",
+        "price": 8.5,
+        "recent_points": [4, 6, 2],
+    }
+
+
+def test_stream_uses_eager_key_precedence(tmp_path):
+    """Streaming reads 'players' even when 'data' comes first in the file."""
+    pytest.importorskip("ijson")
+    
+    file_path = tmp_path / "players.json"
+    file_path.write_text(json.dumps({
+        "data": [_raw_player(1)],
+        "players": [_raw_player(i) for i in range(2, 6)],
+    }))
+    
+    eager = load_players_from_json(str(file_path))
+    streamed = load_players_from_json(str(file_path), stream=True)
+    
+    assert [p.id for p in eager] == [2, 3, 4, 5]
+    assert streamed == eager
+
+
+def test_invalid_row_is_skipped_and_order_kept(capsys):
+    rows = [_raw_player(1), _raw_player(2), _raw_player(3), _raw_player(4)]
+    rows[1]["recent_points"] = ["not a number"]
+    
+    players = parse_players_from_json(rows)
+    
+    assert [p.id for p in players] == [1, 3, 4]
+    assert capsys.readouterr().out.count("Warning: Failed to parse player data") == 1
+
+
+def test_batch_load_keeps_file_order(tmp_path):
+    layouts = [
+        {"players": [_raw_player(1), _raw_player(2)]},
+        [_raw_player(3)],
+        {"elements": [_raw_player(4), _raw_player(5)]},
+    ]
+    paths = []
+    for i, data in enumerate(layouts):
+        file_path = tmp_path / f"players_{i}.json"
+        file_path.write_text(json.dumps(data))
+        paths.append(str(file_path))
+    
+    players = load_players_from_json_batch(paths)
+    
+    assert [p.id for p in players] == [1, 2, 3, 4, 5]
+    assert players == [p for path in paths for p in load_players_from_json(path)]
+
+
+def test_batch_load_missing_file_raises(tmp_path):
+    file_path = tmp_path / "players.json"
+    file_path.write_text(json.dumps([_raw_player(1)]))
+    missing = str(tmp_path / "missing.json")
+    
+    with pytest.raises(FileNotFoundError, match=re.escape(f"JSON file not found: {missing}")):
+        load_players_from_json_batch([str(file_path), missing])
+    with pytest.raises(FileNotFoundError, match=re.escape(f"JSON file not found: {missing}")):
+        load_json_file(missing)
+
+
+def test_null_price_is_read_as_zero_with_warning(capsys):
+    rows = [_raw_player(1), _raw_player(2)]
+    rows[1]["price"] = None
+    
+    players = parse_players_from_json(rows)
+    
+    assert [p.price for p in players] == [8.5, 0.0]
+    assert "Warning: Failed to parse player price None, using 0.0" in capsys.readouterr().out
+
+
+def test_missing_price_is_read_as_zero_silently(capsys):
+    row = _raw_player(1)
+    del row["price"]
+    
+    assert parse_players_from_json([row])[0].price == 0.0
+    assert capsys.readouterr().out == ""
+
+
+def test_malformed_bankroll_warns(tmp_path, capsys):
+    file_path = tmp_path / "team.json"
+    file_path.write_text(json.dumps({"players": [_raw_player(1)], "bankroll": "lots", "total_value": 8.5}))
+    
+    team_state = load_team_state_from_json(str(file_path))
+    
+    assert team_state.bankroll == 0.0
+    assert "Warning: Failed to parse bankroll 'lots', using 0.0" in capsys.readouterr().out
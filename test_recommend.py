@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the Fantasy LaLiga recommendation engine.
+"""
+
+import random
+
+import pytest
+
+from fantasy_ai.src import recommend
+from fantasy_ai.src.schemas import Player, TeamState, Market, SwapRecommendation
+
+POSITIONS = ["Portero", "Defensa", "Centrocampista", "Delantero"]
+TEAMS = ["Real Madrid", "Barcelona", "Getafe", "Cadiz"]
+
+
+def _random_player(player_id, rng):
+    games_played = rng.choice([3, 5, 8, 14])
+    return Player(
+        id=player_id,
+        name=f"Player {player_id}",
+        team=rng.choice(TEAMS),
+        position=rng.choice(POSITIONS),
+        price=round(rng.uniform(0.5, 13.0), 1),
+        total_points=rng.randint(0, 160),
+        minutes_played=games_played * rng.randint(10, 90),
+        games_played=games_played,
+        recent_points=[rng.randint(-2, 18) for _ in range(5)],
+        next_fixtures=[rng.choice(TEAMS) for _ in range(3)],
+    )
+
+
+def _random_league(seed, bankroll=10.0, n_market=25):
+    rng = random.Random(seed)
+    players = [_random_player(i, rng) for i in range(1, 16 + n_market)]
+    team_state = TeamState(players=players[:15], bankroll=bankroll, total_value=100.0)
+    return team_state, Market(available_players=players[15:])
+
+
+def _swap(sell_id, buy_id, cost_difference):
+    return SwapRecommendation(
+        sell_player_id=sell_id,
+        buy_player_id=buy_id,
+        expected_points_gain=1.0,
+        cost_difference=cost_difference,
+        risk_assessment="Similar risk",
+        confidence=0.5,
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_one_to_one_swaps_are_conflict_free_and_affordable(seed):
+    bankroll = random.Random(seed).uniform(0.0, 20.0)
+    team_state, market = _random_league(seed, bankroll=bankroll, n_market=60)
+    
+    for max_recommendations in (3, 10):
+        swaps = recommend.recommend_swaps(team_state, market, max_recommendations=max_recommendations,
+                                          one_to_one=True)
+        
+        sell_ids = [swap.sell_player_id for swap in swaps]
+        buy_ids = [swap.buy_player_id for swap in swaps]
+        assert len(set(sell_ids)) == len(sell_ids)
+        assert len(set(buy_ids)) == len(buy_ids)
+        assert sum(swap.cost_difference for swap in swaps) <= bankroll + 1e-9
+
+
+def test_fit_swaps_to_budget_drops_lowest_ranked_costly_swaps():
+    swaps = [_swap(1, 11, 5.0), _swap(2, 12, -3.0), _swap(3, 13, 4.0), _swap(4, 14, 2.0)]
+    
+    # Net cost 8.0: dropping swaps 3 then 2 brings it to 2.0; the money-freeing swap stays
+    assert recommend._fit_swaps_to_budget(swaps, [0, 1, 2, 3], bankroll=4.0) == [0, 1]
+    assert recommend._fit_swaps_to_budget(swaps, [0, 1, 2, 3], bankroll=8.0) == [0, 1, 2, 3]
+
+
+def test_greedy_swaps_match_assignment_on_fixed_market(monkeypatch):
+    pytest.importorskip("scipy")
+    team_state, market = _random_league(34, n_market=25)
+    
+    assigned = recommend.recommend_swaps(team_state, market, one_to_one=True)
+    monkeypatch.setattr(recommend, "linear_sum_assignment", None)
+    greedy = recommend.recommend_swaps(team_state, market, one_to_one=True)
+    
+    assert len(assigned) > 1
+    assert {(s.sell_player_id, s.buy_player_id) for s in greedy} == \
+        {(s.sell_player_id, s.buy_player_id) for s in assigned}
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the Fantasy LaLiga data models.
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from fantasy_ai.src.features import calculate_risk_score
+from fantasy_ai.src.schemas import Player
+
+FIELDS = dict(
+    id=7,
+    name="Player 7",
+    team="Getafe",
+    position="Defensa",
+    price=6.5,
+    total_points=48,
+    availability="doubtful",
+    minutes_played=630,
+    games_played=8,
+    recent_points=[2, 9, 1],
+    next_fixtures=["Cadiz", "Barcelona"],
+)
+
+UPDATE = dict(position="Delantero", availability="available", recent_points=(12, 0, 7, 3, 10))
+
+
+def test_player_is_frozen():
+    player = Player(**FIELDS)
+    
+    with pytest.raises(ValidationError):
+        player.price = 7.0
+
+
+def test_model_copy_recomputes_cached_codes():
+    player = Player(**FIELDS)
+    # Fill the caches before copying
+    player.position_index, player.status_index, player.recent_points_stats
+    
+    copied = player.model_copy(update=UPDATE)
+    fresh = Player(**{**FIELDS, **UPDATE})
+    
+    assert copied.position_index == fresh.position_index
+    assert copied.status_index == fresh.status_index
+    assert copied.recent_points_stats == fresh.recent_points_stats
+    assert player.position_index != fresh.position_index
+
+
+def test_risk_score_of_updated_copy_matches_fresh_player():
+    player = Player(**FIELDS)
+    original_risk = calculate_risk_score(player)
+    
+    copied = player.model_copy(update={"recent_points": UPDATE["recent_points"]})
+    fresh = Player(**{**FIELDS, "recent_points": UPDATE["recent_points"]})
+    
+    assert calculate_risk_score(copied) == calculate_risk_score(fresh)
+    assert calculate_risk_score(fresh) != original_risk